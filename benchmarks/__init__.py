@@ -0,0 +1 @@
+# Benchmarks for G120 Desk Planning System
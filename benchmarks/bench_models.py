@@ -0,0 +1,88 @@
+"""
+Benchmark: plain dict bookings vs. the slotted models held by the store
+
+Compares the memory per booking of the parsed JSON dicts and of the
+store's Desk/Booking objects, the one-time conversion when the store
+loads a file, and the cost of the sorting/filtering done in
+show_all_bookings and show_weekly_view on a synthetic large plan.
+
+Usage: python -m benchmarks.bench_models [--desks N] [--bookings N]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Dict, Any
+from benchmarks.generate_plan import generate_plan
+from modules.config import WEEKDAYS_ALL
+from modules.models import bookings_of, config_from_json
+
+def measure_memory(build) -> int:
+    """Bytes allocated (and still alive) by build()"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+def timed(func, repeat: int = 3) -> float:
+    """Best wall time of func() in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def sort_and_filter_dicts(config: Dict[str, Any]):
+    for tisch in config["tische"].values():
+        buchungen = tisch["buchungen"]
+        # show_all_bookings
+        sorted(buchungen.items(), key=lambda x: (WEEKDAYS_ALL.index(x[1].get("tag", "Monday")), x[1].get("zeitslot", "")))
+        # show_weekly_view
+        for tag in WEEKDAYS_ALL:
+            for buchung in buchungen.values():
+                if buchung.get("tag") == tag:
+                    buchung.get("zeitslot")
+
+def sort_and_filter_models(config: Dict[str, Any]):
+    for tisch in config["tische"].values():
+        belegung = {}
+        for buchung in bookings_of(tisch["buchungen"]):
+            belegung.setdefault((buchung.tag, buchung.slot), []).append(buchung.person)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--desks", type=int, default=1000)
+    parser.add_argument("--bookings", type=int, default=60, help="bookings per desk (max 84)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    plan = generate_plan(args.desks, args.bookings, type_mix={"schedule": 1.0}, weekend=True, seed=args.seed)
+    raw = json.dumps(plan)
+    anzahl = sum(len(t["buchungen"]) for t in plan["tische"].values())
+
+    dict_bytes = measure_memory(lambda: json.loads(raw))
+    # The parsed dicts are garbage once converted, only the store's objects stay alive
+    model_bytes = measure_memory(lambda: config_from_json(json.loads(raw)))
+
+    dicts = json.loads(raw)
+    models = config_from_json(dicts)
+    convert_time = timed(lambda: config_from_json(dicts))
+    dict_time = timed(lambda: sort_and_filter_dicts(dicts))
+    model_time = timed(lambda: sort_and_filter_models(models))
+
+    print(json.dumps({
+        "bookings": anzahl,
+        "bytes_per_booking_dict": round(dict_bytes / anzahl, 1),
+        "bytes_per_booking_model": round(model_bytes / anzahl, 1),
+        "convert_on_load_s": round(convert_time, 4),
+        "sort_filter_dict_s": round(dict_time, 4),
+        "sort_filter_model_s": round(model_time, 4)
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Startup-time benchmark for the data layer
+
+Imports each target module in a fresh interpreter with `python -X importtime`
+and reports the import time on top of a bare interpreter start. Fails (exit
+code 1) if a target exceeds the budget or pulls in a UI-only package such as
+Streamlit, so headless scripts and workers stay fast to start.
+
+Usage: python -m benchmarks.bench_startup [--budget-ms 50] [--repeat 5] [modules ...]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List, Tuple
+
+# Pages and widgets of the app, every other module of the package is data layer
+UI_MODULES = {"modules.debug_panel", "modules.desk_config", "modules.desk_planning", "modules.room_view"}
+
+# Packages the data layer must not import
+FORBIDDEN = ["streamlit", "pandas", "numpy"]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def data_layer_modules() -> List[str]:
+    """All modules of the modules package except UI_MODULES (new modules are covered automatically)"""
+    namen = sorted(
+        os.path.splitext(datei)[0] for datei in os.listdir(os.path.join(REPO_ROOT, "modules"))
+        if datei.endswith(".py") and datei != "__init__.py"
+    )
+    return [f"modules.{name}" for name in namen if f"modules.{name}" not in UI_MODULES]
+
+# Modules that must import without Streamlit
+DEFAULT_TARGETS = data_layer_modules()
+
+def run_importtime(code: str) -> Tuple[Dict[str, int], float]:
+    """
+    Run code in a fresh interpreter with -X importtime
+    Returns (top-level module -> cumulative import time in us, wall time in s).
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - start
+
+    top_level = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented below their parent
+        if not name.startswith("  "):
+            top_level[name.strip()] = int(cumulative)
+    return top_level, wall
+
+def imported_modules(code: str) -> List[str]:
+    """Names of all modules imported by code (beyond interpreter startup)"""
+    script = f"import sys; before = set(sys.modules); {code}; print('\\n'.join(sorted(set(sys.modules) - before)))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+def measure_target(target: str, baseline: Dict[str, int], baseline_wall: float, repeat: int) -> Dict[str, Any]:
+    import_ms, wall_ms = [], []
+    for _ in range(repeat):
+        top_level, wall = run_importtime(f"import {target}")
+        import_ms.append(sum(us for name, us in top_level.items() if name not in baseline) / 1000)
+        wall_ms.append((wall - baseline_wall) * 1000)
+
+    geladen = imported_modules(f"import {target}")
+    return {
+        "import_ms": round(statistics.median(import_ms), 2),
+        "wall_ms_over_bare_python": round(statistics.median(wall_ms), 2),
+        "modules_imported": len(geladen),
+        "forbidden_imported": sorted({m.split(".")[0] for m in geladen if m.split(".")[0] in FORBIDDEN})
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS)
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="maximum import time per target")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline, _ = run_importtime("pass")
+    baseline_wall = statistics.median(run_importtime("pass")[1] for _ in range(args.repeat))
+
+    results = {target: measure_target(target, baseline, baseline_wall, args.repeat) for target in args.targets}
+    print(json.dumps({"budget_ms": args.budget_ms, "results": results}, indent=2))
+
+    fehler = []
+    for target, werte in results.items():
+        if werte["import_ms"] > args.budget_ms:
+            fehler.append(f"{target}: import takes {werte['import_ms']} ms (budget {args.budget_ms} ms)")
+        if werte["forbidden_imported"]:
+            fehler.append(f"{target}: imports {', '.join(werte['forbidden_imported'])}")
+    for line in fehler:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if fehler:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
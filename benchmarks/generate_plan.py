@@ -0,0 +1,122 @@
+"""
+Synthetic plan generator
+
+Builds configurations in the data/tische_config.json layout with a
+configurable number of desks, bookings per desk, people and desk type mix.
+
+Usage: python -m benchmarks.generate_plan --desks 500 --output /tmp/plan.json
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from modules.config import WEEKDAYS, WEEKDAYS_ALL, TIMESLOTS_BOOKING, TIMESLOTS, DESK_TYPES, COMPUTER_MODES
+from modules.utils import WEEKDAY_MAPPING, COMPUTER_MODE_MAPPING
+
+# Default share of each desk type
+DEFAULT_TYPE_MIX = {"schedule": 0.7, "fullbooking": 0.2, "projekt": 0.1}
+
+# Share of computer setups (vorhanden, typ) on generated desks
+COMPUTER_MIX = [((True, "GPU"), 0.3), ((True, "CPU"), 0.5), ((False, "None"), 0.2)]
+
+GERMAN_WEEKDAYS = {en: de for de, en in WEEKDAY_MAPPING.items()}
+GERMAN_COMPUTER_MODES = {en: de for de, en in COMPUTER_MODE_MAPPING.items()}
+
+def parse_type_mix(text: str) -> Dict[str, float]:
+    """Parse "schedule=0.7,fullbooking=0.2,projekt=0.1" """
+    mix = {}
+    for part in text.split(","):
+        typ, _, anteil = part.partition("=")
+        if typ not in DESK_TYPES:
+            raise ValueError(f"Unknown desk type: {typ}")
+        mix[typ] = float(anteil)
+    return mix
+
+def generate_plan(desks: int = 100, bookings_per_desk: int = 20, people: int = 200,
+                  type_mix: Optional[Dict[str, float]] = None, weekend: bool = False,
+                  legacy: float = 0.0, seed: int = 0) -> Dict[str, Any]:
+    """
+    Generate a synthetic plan
+    desks: number of desks
+    bookings_per_desk: bookings on each schedule desk (capped by the free slots)
+    people: number of distinct person names
+    type_mix: desk type -> share
+    weekend: also book Saturday/Sunday and the evening slots
+    legacy: share of bookings written with German names (exercises migrate_weekdays)
+    """
+    rnd = random.Random(seed)
+    type_mix = type_mix or DEFAULT_TYPE_MIX
+    typen, gewichte = list(type_mix), list(type_mix.values())
+    setups, setup_gewichte = zip(*COMPUTER_MIX)
+    personen = [f"Person {i:04d}" for i in range(people)]
+    tage = WEEKDAYS_ALL if weekend else WEEKDAYS
+    slots = TIMESLOTS if weekend else TIMESLOTS_BOOKING
+    alle_slots = [(tag, zeitslot) for tag in tage for zeitslot in slots]
+    start = datetime(2025, 10, 1)
+
+    tische = {}
+    for desk_id in range(desks):
+        typ = rnd.choices(typen, gewichte)[0]
+        vorhanden, rechner_typ = rnd.choices(setups, setup_gewichte)[0]
+        tisch = {
+            "name": f"Desk {desk_id}",
+            "typ": typ,
+            "rechner": {
+                "vorhanden": vorhanden,
+                "typ": rechner_typ,
+                "name": f"{rechner_typ}-{desk_id:04d}" if vorhanden else "",
+                "abschaltbar": vorhanden and rnd.random() < 0.7,
+                "bildschirme": rnd.choice([0, 1, 2, 2])
+            },
+            "buchungen": {}
+        }
+
+        if typ == "schedule":
+            for tag, zeitslot in rnd.sample(alle_slots, min(bookings_per_desk, len(alle_slots))):
+                erstellt = start + timedelta(seconds=rnd.randrange(60 * 60 * 24 * 30), microseconds=rnd.randrange(10 ** 6))
+                modus = rnd.choice(COMPUTER_MODES[:3]) if vorhanden else COMPUTER_MODES[3]
+                key_tag = tag
+                if rnd.random() < legacy:
+                    tag, modus = GERMAN_WEEKDAYS[tag], GERMAN_COMPUTER_MODES[modus]
+                    key_tag = tag
+                tisch["buchungen"][f"{key_tag}_{zeitslot}_{erstellt.strftime('%Y%m%d%H%M%S%f')}"] = {
+                    "person": rnd.choice(personen),
+                    "tag": tag,
+                    "zeitslot": zeitslot,
+                    "rechner_modus": modus,
+                    "notizen": "" if rnd.random() < 0.8 else "Synthetic note",
+                    "erstellt_am": erstellt.strftime("%Y-%m-%d %H:%M:%S")
+                }
+        elif typ == "fullbooking":
+            tisch["gebucht_von"] = rnd.choice(personen + [""])
+        else:
+            tisch["projekt_name"] = f"Project {rnd.randrange(people // 10 + 1)}"
+            tisch["gebucht_von"] = rnd.choice(personen)
+
+        tische[str(desk_id)] = tisch
+    return {"tische": tische}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--desks", type=int, default=100)
+    parser.add_argument("--bookings", type=int, default=20, help="bookings per schedule desk")
+    parser.add_argument("--people", type=int, default=200)
+    parser.add_argument("--types", type=parse_type_mix, default=DEFAULT_TYPE_MIX,
+                        help="desk type mix, e.g. schedule=0.7,fullbooking=0.2,projekt=0.1")
+    parser.add_argument("--weekend", action="store_true", help="also use weekend and evening slots")
+    parser.add_argument("--legacy", type=float, default=0.0, help="share of bookings with German names")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    plan = generate_plan(args.desks, args.bookings, args.people, args.types, args.weekend, args.legacy, args.seed)
+    text = json.dumps(plan, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Benchmark suite for the booking pipeline
+
+Times the data layer on a synthetic plan and reports wall time and peak
+memory per benchmark as JSON. With --compare the results are checked
+against an earlier report and the exit code is 1 on regressions.
+
+Usage:
+    python -m benchmarks.run_benchmarks --desks 500 --output bench.json
+    python -m benchmarks.run_benchmarks --desks 500 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional
+from benchmarks.generate_plan import generate_plan, parse_type_mix, DEFAULT_TYPE_MIX
+from modules import store as store_registry
+from modules.bookings import add_bookings, new_booking
+from modules.config import TIMESLOTS, WEEKDAYS_ALL
+from modules.integrity import check_config
+from modules.models import weekly_occupancy
+from modules.store import ConfigStore
+from modules.utils import load_config, migrate_weekdays, write_config, get_desk_status
+
+# Room id the benchmark store is registered under for the booking functions
+BENCHMARK_ROOM = "_benchmark"
+
+def measure(func: Callable[[Any], Any], setup: Optional[Callable[[], Any]] = None,
+            repeat: int = 5) -> Dict[str, float]:
+    """
+    Time func(setup()) repeat times and measure its peak memory once
+    setup() is not included in the measurement.
+    """
+    zeiten = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        zeiten.append(time.perf_counter() - start)
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "best_s": round(min(zeiten), 6),
+        "mean_s": round(sum(zeiten) / len(zeiten), 6),
+        "peak_bytes": peak
+    }
+
+def run_suite(plan: Dict[str, Any], legacy_plan: Dict[str, Any], repeat: int) -> Dict[str, Dict[str, float]]:
+    """Run all benchmarks, returns benchmark name -> measurement"""
+    results = {}
+    raw = json.dumps(plan)
+    legacy_raw = json.dumps(legacy_plan)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tische_config.json")
+        write_config(json.loads(raw), path)
+
+        results["load_config"] = measure(lambda _: load_config(path), repeat=repeat)
+
+        results["migrate_weekdays"] = measure(
+            migrate_weekdays, setup=lambda: json.loads(legacy_raw), repeat=repeat)
+
+        results["write_config"] = measure(
+            lambda config: write_config(config, path), setup=lambda: json.loads(raw), repeat=repeat)
+
+        def fresh_store():
+            store = ConfigStore(path)
+            store.snapshot()
+            return store
+
+        # save_config() replaces the whole configuration in the store
+        results["save_config"] = measure(
+            lambda store: store.replace(json.loads(raw)), setup=fresh_store, repeat=repeat)
+
+        # Loading includes the conversion into the store's Desk objects
+        results["store_load"] = measure(lambda _: ConfigStore(path).snapshot(), repeat=repeat)
+
+        # The views read the store's snapshot
+        _, config = fresh_store().snapshot()
+        tische = config["tische"]
+        results["get_desk_status_all"] = measure(
+            lambda _: [get_desk_status(t) for t in tische.values()], repeat=repeat)
+
+        results["integrity_check"] = measure(lambda _: check_config(config), repeat=repeat)
+
+        results["weekly_view"] = measure(
+            lambda _: [weekly_occupancy(d.get("buchungen", {})) for d in tische.values()], repeat=repeat)
+
+        def free_slot():
+            # Registered under its own room id, so add_bookings() uses this store
+            store = fresh_store()
+            store_registry._stores[BENCHMARK_ROOM] = store
+            _, snapshot = store.snapshot()
+            for tisch_id, tisch in snapshot["tische"].items():
+                if tisch.get("typ") != "schedule":
+                    continue
+                belegt = {(b.get("tag"), b.get("zeitslot")) for b in tisch.get("buchungen", {}).values()}
+                for tag in WEEKDAYS_ALL:
+                    for zeitslot in TIMESLOTS:
+                        if (tag, zeitslot) not in belegt:
+                            return tisch_id, tag, zeitslot
+            raise RuntimeError("No free slot left for the booking benchmark")
+
+        def insert_booking(slot):
+            # The path of the booking form: read-modify-write with conflict check
+            tisch_id, tag, zeitslot = slot
+            key, buchung = new_booking("Benchmark", tag, zeitslot, "No Computer")
+            if add_bookings(BENCHMARK_ROOM, tisch_id, {key: buchung}):
+                raise RuntimeError(f"Benchmark slot {tag} {zeitslot} on desk {tisch_id} was taken")
+
+        try:
+            results["booking_insertion"] = measure(insert_booking, setup=free_slot, repeat=repeat)
+        finally:
+            store_registry._stores.pop(BENCHMARK_ROOM, None)
+
+    return results
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], tolerance: float,
+            min_delta: float = 0.001) -> list:
+    """
+    Benchmarks slower than the baseline by more than tolerance
+    Differences below min_delta seconds are treated as noise.
+    """
+    regressions = []
+    for name, werte in results.items():
+        alt = baseline.get("results", {}).get(name)
+        if not alt or werte["best_s"] - alt["best_s"] < min_delta:
+            continue
+        if werte["best_s"] > alt["best_s"] * (1 + tolerance):
+            regressions.append(f"{name}: {alt['best_s']:.6f}s -> {werte['best_s']:.6f}s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--desks", type=int, default=500)
+    parser.add_argument("--bookings", type=int, default=30, help="bookings per schedule desk")
+    parser.add_argument("--people", type=int, default=300)
+    parser.add_argument("--types", type=parse_type_mix, default=DEFAULT_TYPE_MIX,
+                        help="desk type mix, e.g. schedule=0.7,fullbooking=0.2,projekt=0.1")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="earlier JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=0.001, help="ignore slowdowns below this many seconds")
+    args = parser.parse_args()
+
+    plan = generate_plan(args.desks, args.bookings, args.people, args.types, seed=args.seed)
+    legacy_plan = generate_plan(args.desks, args.bookings, args.people, args.types, legacy=1.0, seed=args.seed)
+
+    report = {
+        "meta": {
+            "desks": args.desks,
+            "bookings_per_desk": args.bookings,
+            "people": args.people,
+            "types": args.types,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        },
+        "results": run_suite(plan, legacy_plan, args.repeat)
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(report["results"], json.load(f), args.tolerance, args.min_delta)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
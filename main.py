@@ -1,11 +1,26 @@
 """
 G120 Desk Planning System - Main Application
 """
+import importlib
+import os
 import streamlit as st
-from modules.utils import load_config
-from modules.desk_planning import show_tischplanung_modus
-from modules.room_view import show_raumansicht_modus
-from modules.desk_config import show_tischbearbeitung_modus
+from modules import instrumentation
+from modules.config import DEFAULT_ROOM
+from modules.integrity import get_monitor
+from modules.rooms import load_rooms
+from modules.store import get_store
+
+# Mode -> (module, function); modules are imported when the mode is first selected
+MODI = {
+    "📋 Desk Planning": ("modules.desk_planning", "show_tischplanung_modus"),
+    "🗺️ Room View": ("modules.room_view", "show_raumansicht_modus"),
+    "🔧 Desk Configuration": ("modules.desk_config", "show_tischbearbeitung_modus")
+}
+
+def load_mode_function(modus: str):
+    """Import the module of a mode on demand and return its mode function"""
+    module_name, function_name = MODI[modus]
+    return getattr(importlib.import_module(module_name), function_name)
 
 def initialize_session_state():
     """Initialize session state variables"""
@@ -15,51 +30,132 @@ def initialize_session_state():
         st.session_state.selected_tisch_from_room = None
     if 'selected_slots' not in st.session_state:
         st.session_state.selected_slots = set()
+    if 'config_version' not in st.session_state:
+        st.session_state.config_version = None
+    if 'selected_room' not in st.session_state:
+        st.session_state.selected_room = DEFAULT_ROOM
 
-def main():
-    """Main application function"""
-    # Page configuration
-    st.set_page_config(
-        page_title="G120 Desk Planning",
-        page_icon="🪑",
-        layout="wide"
-    )
-    
-    st.title("🪑 G120 Desk Planning System")
-    st.markdown("---")
-    
-    # Initialize session state
-    initialize_session_state()
+def select_room(rooms: dict):
+    """Room selection in the sidebar (only shown if there is more than one room)"""
+    if st.session_state.selected_room not in rooms:
+        st.session_state.selected_room = next(iter(rooms))
+    if len(rooms) > 1:
+        st.sidebar.selectbox(
+            "🏢 Room:",
+            list(rooms),
+            format_func=lambda r: f"{rooms[r]['building']} / {rooms[r]['name']}" if rooms[r]['building'] else rooms[r]['name'],
+            key="selected_room"
+        )
+
+def sync_session_with_store(room_id: str, version: int, tische: dict):
+    """Refresh session state for desks that were changed by other sessions"""
+    last = st.session_state.config_version
+    st.session_state.config_version = (room_id, version)
+    if last is None or last == (room_id, version):
+        return
     
-    # Load configuration
-    config = load_config()
-    tische = config.get("tische", {})
+    last_room, last_version = last
+    if last_room != room_id:
+        # Switched to another room, selections of the old room are meaningless
+        st.session_state.selected_slots = set()
+        st.session_state.selected_tisch_from_room = None
+        return
     
-    # Sidebar - Mode selection
-    st.sidebar.title("⚙️ Navigation")
+    changed = get_store(room_id).changes_since(last_version)
+    if changed is None:
+        # Too far behind, treat every desk as changed
+        changed = set(tische.keys())
     
-    # Radio button with current mode from session state
-    modus = st.sidebar.radio(
-        "Select mode:",
-        ["📋 Desk Planning", "🗺️ Room View", "🔧 Desk Configuration"],
-        label_visibility="collapsed",
-        index=["📋 Desk Planning", "🗺️ Room View", "🔧 Desk Configuration"].index(st.session_state.selected_modus)
-    )
+    # Drop selected time slots that were booked in the meantime on the selected desk
+    selected_tisch = st.session_state.get("tisch_selector")
+    if selected_tisch in changed and selected_tisch in tische:
+        gebucht = {
+            f"{b.get('tag')}_{b.get('zeitslot')}"
+            for b in tische[selected_tisch].get("buchungen", {}).values()
+        }
+        st.session_state.selected_slots -= gebucht
     
-    # Update session state when manually switched
-    if modus != st.session_state.selected_modus:
-        st.session_state.selected_modus = modus
-        st.session_state.selected_tisch_from_room = None  # Reset on manual switch
+    if changed:
+        desks = ", ".join(sorted(changed, key=lambda t: (len(t), t)))
+        st.toast(f"🔄 Updated: Desk {desks}")
+
+def show_integrity_status(room_id: str):
+    """Sidebar warning listing the integrity violations of the room"""
+    monitor = get_monitor(room_id)
+    verstoesse = monitor.violations()
+    if not verstoesse:
+        return
     
-    st.sidebar.markdown("---")
+    with st.sidebar.expander(f"⚠️ {len(verstoesse)} integrity problems"):
+        for verstoss in verstoesse[:20]:
+            st.caption(verstoss.meldung + ("" if verstoss.reparierbar else " (manual fix needed)"))
+        if len(verstoesse) > 20:
+            st.caption(f"... and {len(verstoesse) - 20} more")
+        if any(v.reparierbar for v in verstoesse) and st.button("🛠️ Repair", key="integrity_repair"):
+            repariert = monitor.repair()
+            st.toast(f"🛠️ Repaired {repariert} desks")
+            st.rerun()
+
+def main():
+    """Main application function"""
+    with instrumentation.rerun():
+        with instrumentation.phase("page_setup"):
+            # Page configuration
+            st.set_page_config(
+                page_title="G120 Desk Planning",
+                page_icon="🪑",
+                layout="wide"
+            )
+            
+            st.title("🪑 G120 Desk Planning System")
+            st.markdown("---")
+            
+            # Initialize session state
+            initialize_session_state()
+        
+        with instrumentation.phase("navigation"):
+            # Sidebar - Room and mode selection
+            st.sidebar.title("⚙️ Navigation")
+            select_room(load_rooms())
+            room_id = st.session_state.selected_room
+            
+            # Radio button with current mode from session state
+            modus = st.sidebar.radio(
+                "Select mode:",
+                list(MODI),
+                label_visibility="collapsed",
+                index=list(MODI).index(st.session_state.selected_modus)
+            )
+            
+            # Update session state when manually switched
+            if modus != st.session_state.selected_modus:
+                st.session_state.selected_modus = modus
+                st.session_state.selected_tisch_from_room = None  # Reset on manual switch
+            
+            st.sidebar.markdown("---")
+        
+        with instrumentation.phase("config_load"):
+            # Load configuration of the active room only (shared snapshot, read-only)
+            store = get_store(room_id)
+            version, config = store.snapshot()
+            tische = config.get("tische", {})
+            if not os.path.exists(store.path):
+                st.error(f"Configuration file {store.path} not found!")
+        
+        with instrumentation.phase("integrity"):
+            show_integrity_status(room_id)
+        
+        with instrumentation.phase("session_sync"):
+            sync_session_with_store(room_id, version, tische)
+        
+        # Different view depending on mode (mode functions time themselves)
+        with instrumentation.phase("mode_import"):
+            show_modus = load_mode_function(modus)
+        show_modus(config, tische)
     
-    # Different view depending on mode
-    if modus == "📋 Desk Planning":
-        show_tischplanung_modus(config, tische)
-    elif modus == "🗺️ Room View":
-        show_raumansicht_modus(config, tische)
-    elif modus == "🔧 Desk Configuration":
-        show_tischbearbeitung_modus(config, tische)
+    if instrumentation.ENABLED:
+        from modules.debug_panel import show_debug_panel
+        show_debug_panel()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,70 @@
+"""
+Atomic booking operations for G120 Desk Planning System
+
+Data layer only (no Streamlit). Bookings are added and deleted with a
+read-modify-write of the current desk under the store's write lock, so
+two sessions booking the same desk at the same time cannot overwrite
+each other and a slot can never be booked twice.
+"""
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from modules.store import get_store
+
+def new_booking(person: str, tag: str, zeitslot: str, rechner_modus: str, notizen: str = "") -> Tuple[str, Dict[str, Any]]:
+    """Key and data of a new booking"""
+    jetzt = datetime.now()
+    return f"{tag}_{zeitslot}_{jetzt.strftime('%Y%m%d%H%M%S%f')}", {
+        "person": person,
+        "tag": tag,
+        "zeitslot": zeitslot,
+        "rechner_modus": rechner_modus,
+        "notizen": notizen,
+        "erstellt_am": jetzt.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def add_bookings(room_id: str, tisch_id: str, neue_buchungen: Dict[str, Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """
+    Add bookings to a schedule desk (all or nothing)
+    Returns the (day, slot) pairs that are already booked; in that case nothing is written.
+    Raises ValueError if the desk does not exist or is not a schedule desk.
+    """
+    konflikte: List[Tuple[str, str]] = []
+
+    def modify(tisch: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if tisch is None:
+            raise ValueError(f"Desk {tisch_id} not found")
+        if tisch.get("typ", "schedule") != "schedule":
+            raise ValueError(f"Desk {tisch_id} is not a schedule desk")
+        buchungen = tisch.get("buchungen", {})
+        belegt = {(b.get("tag"), b.get("zeitslot")) for b in buchungen.values()}
+        neu = set()
+        for buchung in neue_buchungen.values():
+            slot = (buchung["tag"], buchung["zeitslot"])
+            if slot in belegt or slot in neu:
+                konflikte.append(slot)
+            neu.add(slot)
+        if konflikte:
+            return None
+        return {**tisch, "buchungen": {**buchungen, **neue_buchungen}}
+
+    get_store(room_id).modify_desk(tisch_id, modify)
+    return konflikte
+
+def delete_booking(room_id: str, tisch_id: str, key: str) -> Optional[Dict[str, Any]]:
+    """Delete a booking by its key, returns the deleted booking (None if it no longer exists)"""
+    geloescht = []
+
+    def modify(tisch: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if tisch is None or key not in tisch.get("buchungen", {}):
+            return None
+        geloescht.append(tisch["buchungen"][key])
+        return {**tisch, "buchungen": {k: v for k, v in tisch["buchungen"].items() if k != key}}
+
+    get_store(room_id).modify_desk(tisch_id, modify)
+    return geloescht[0] if geloescht else None
+
+def update_desk_fields(room_id: str, tisch_id: str, felder: Dict[str, Any]) -> bool:
+    """Set some fields of a desk, keeping everything else (e.g. bookings made meanwhile)"""
+    def modify(tisch: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return {**tisch, **felder} if tisch is not None else None
+    return get_store(room_id).modify_desk(tisch_id, modify) is not None
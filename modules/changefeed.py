@@ -0,0 +1,366 @@
+"""
+Change feed and snapshot diffs for G120 Desk Planning System
+
+Every write of a room through the store is recorded as a numbered entry
+in an append-only file next to the shard. An entry holds a compact diff
+(changed desk fields and single bookings instead of whole desks), so
+external consumers (door displays, power planner, calendar exports) can
+stay in sync by fetching only the changes since the revision they know:
+
+    antwort = sync("G120", since=revision, feed_id=feed_id)
+    config = apply_sync(config, antwort)
+
+Revisions continue across restarts and are unique across processes
+writing the same room. If the shard was changed outside of any store
+(e.g. edited by hand) in a way no diff can be derived for, a reset entry
+is recorded and consumers older than it get a full snapshot instead.
+
+Diff operations:
+    {"op": "tisch_neu", "tisch": id, "daten": {...}}
+    {"op": "tisch_entfernt", "tisch": id}
+    {"op": "tisch_felder", "tisch": id, "felder": {...}, "entfernt": [...]}
+    {"op": "buchung", "tisch": id, "key": key, "daten": {...}}
+    {"op": "buchung_entfernt", "tisch": id, "key": key}
+    {"op": "extra", "key": key, "wert": value}
+    {"op": "extra_entfernt", "key": key}
+"""
+import copy
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from modules.config import CHANGE_FEED_SUFFIX, CHANGE_FEED_MAX_ENTRIES, DEFAULT_ROOM
+from modules.jsonlog import JsonLog
+from modules.models import as_json, config_to_json
+
+def feed_path(shard_path: str) -> str:
+    """Change feed file of a shard"""
+    return os.path.splitext(shard_path)[0] + CHANGE_FEED_SUFFIX
+
+def diff_snapshots(alt: Dict[str, Any], neu: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compact diff between two configurations, the values in the operations are in the JSON layout
+    Desks that are the same object in both snapshots (copy-on-write) are skipped without comparing.
+    """
+    ops = []
+    for key in alt.keys() | neu.keys():
+        if key == "tische":
+            continue
+        if key not in neu:
+            ops.append({"op": "extra_entfernt", "key": key})
+        elif key not in alt or alt[key] != neu[key]:
+            ops.append({"op": "extra", "key": key, "wert": neu[key]})
+
+    alt_tische = alt.get("tische", {})
+    neu_tische = neu.get("tische", {})
+    for tisch_id, tisch in neu_tische.items():
+        alt_tisch = alt_tische.get(tisch_id)
+        if alt_tisch is tisch:
+            continue
+        if alt_tisch is None:
+            ops.append({"op": "tisch_neu", "tisch": tisch_id, "daten": as_json(tisch)})
+        elif alt_tisch != tisch:
+            ops.extend(_diff_desk(tisch_id, alt_tisch, tisch))
+    for tisch_id in alt_tische.keys() - neu_tische.keys():
+        ops.append({"op": "tisch_entfernt", "tisch": tisch_id})
+    return ops
+
+def _diff_desk(tisch_id: str, alt: Dict[str, Any], neu: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ops = []
+    felder = {}
+    entfernt = [feld for feld in alt if feld not in neu]
+    for feld, wert in neu.items():
+        if feld == "buchungen" and "buchungen" in alt:
+            continue
+        if feld not in alt or alt[feld] != wert:
+            felder[feld] = as_json(wert)
+    if felder or entfernt:
+        ops.append({"op": "tisch_felder", "tisch": tisch_id, "felder": felder, "entfernt": entfernt})
+
+    if "buchungen" in alt and "buchungen" in neu:
+        alt_buchungen, neu_buchungen = alt["buchungen"], neu["buchungen"]
+        for key, buchung in neu_buchungen.items():
+            if alt_buchungen.get(key) != buchung:
+                ops.append({"op": "buchung", "tisch": tisch_id, "key": key, "daten": as_json(buchung)})
+        for key in alt_buchungen.keys() - neu_buchungen.keys():
+            ops.append({"op": "buchung_entfernt", "tisch": tisch_id, "key": key})
+    return ops
+
+def apply_diff(config: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Return a new configuration with the diff applied (config itself is not modified)"""
+    neu = dict(config)
+    tische = dict(config.get("tische", {}))
+    kopiert = set()
+
+    def tisch_kopie(tisch_id: str) -> Dict[str, Any]:
+        # Copy every touched desk once, untouched desks stay shared
+        if tisch_id not in kopiert:
+            tisch = dict(tische.get(tisch_id, {}))
+            if "buchungen" in tisch:
+                tisch["buchungen"] = dict(tisch["buchungen"])
+            tische[tisch_id] = tisch
+            kopiert.add(tisch_id)
+        return tische[tisch_id]
+
+    for op in ops:
+        art = op["op"]
+        if art == "extra":
+            neu[op["key"]] = copy.deepcopy(op["wert"])
+        elif art == "extra_entfernt":
+            neu.pop(op["key"], None)
+        elif art == "tisch_neu":
+            tische[op["tisch"]] = copy.deepcopy(op["daten"])
+            kopiert.add(op["tisch"])
+        elif art == "tisch_entfernt":
+            tische.pop(op["tisch"], None)
+            kopiert.discard(op["tisch"])
+        elif art == "tisch_felder":
+            tisch = tisch_kopie(op["tisch"])
+            for feld in op["entfernt"]:
+                tisch.pop(feld, None)
+            tisch.update(copy.deepcopy(op["felder"]))
+        elif art == "buchung":
+            tisch_kopie(op["tisch"]).setdefault("buchungen", {})[op["key"]] = copy.deepcopy(op["daten"])
+        elif art == "buchung_entfernt":
+            tisch_kopie(op["tisch"]).get("buchungen", {}).pop(op["key"], None)
+        else:
+            raise ValueError(f"Unknown change operation: {art}")
+    neu["tische"] = tische
+    return neu
+
+def compact_ops(ops: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge a sequence of diffs into the shortest equivalent diff
+    Later operations on the same desk field, booking or top-level key replace earlier ones.
+    """
+    ergebnis: Dict[tuple, Dict[str, Any]] = {}
+
+    def setzen(key: tuple, op: Dict[str, Any]):
+        # Re-insert so the order of the dict is the order of the last change
+        ergebnis.pop(key, None)
+        ergebnis[key] = op
+
+    for op in ops:
+        art = op["op"]
+        if art in ("extra", "extra_entfernt"):
+            setzen(("extra", op["key"]), op)
+            continue
+
+        tisch_id = op["tisch"]
+        tisch_key = ("tisch", tisch_id)
+        vorher = ergebnis.get(tisch_key)
+
+        if art in ("tisch_neu", "tisch_entfernt"):
+            for key in [k for k in ergebnis if k[0] == "buchung" and k[1] == tisch_id]:
+                del ergebnis[key]
+            if art == "tisch_neu":
+                op = {**op, "daten": copy.deepcopy(op["daten"])}
+            setzen(tisch_key, op)
+        elif art == "tisch_felder":
+            if vorher is not None and vorher["op"] == "tisch_neu":
+                daten = vorher["daten"]
+                for feld in op["entfernt"]:
+                    daten.pop(feld, None)
+                daten.update(copy.deepcopy(op["felder"]))
+                continue
+            if "buchungen" in op["felder"] or "buchungen" in op["entfernt"]:
+                for key in [k for k in ergebnis if k[0] == "buchung" and k[1] == tisch_id]:
+                    del ergebnis[key]
+            felder, entfernt = {}, []
+            if vorher is not None and vorher["op"] == "tisch_felder":
+                felder, entfernt = dict(vorher["felder"]), list(vorher["entfernt"])
+            for feld in op["entfernt"]:
+                felder.pop(feld, None)
+                if feld not in entfernt:
+                    entfernt.append(feld)
+            for feld, wert in op["felder"].items():
+                felder[feld] = copy.deepcopy(wert)
+                if feld in entfernt:
+                    entfernt.remove(feld)
+            setzen(tisch_key, {"op": "tisch_felder", "tisch": tisch_id, "felder": felder, "entfernt": entfernt})
+        else:
+            # Bookings of a desk created or given a new booking dict in this diff go into that data
+            if vorher is not None and vorher["op"] in ("tisch_neu", "tisch_felder"):
+                ziel = vorher["daten"] if vorher["op"] == "tisch_neu" else vorher["felder"]
+                if vorher["op"] == "tisch_neu" or "buchungen" in ziel or "buchungen" in vorher["entfernt"]:
+                    if "buchungen" in vorher.get("entfernt", ()):
+                        vorher["entfernt"].remove("buchungen")
+                    buchungen = ziel.setdefault("buchungen", {})
+                    if art == "buchung":
+                        buchungen[op["key"]] = copy.deepcopy(op["daten"])
+                    else:
+                        buchungen.pop(op["key"], None)
+                    continue
+            setzen(("buchung", tisch_id, op["key"]), op)
+    return list(ergebnis.values())
+
+class ChangeFeed:
+    """
+    Numbered change entries of one shard
+    The file starts with a header line {"feed": id}, followed by one entry per line:
+    {"rev": n, "zeit": ..., "mtime": [inode, mtime in ns, size], "ops": [...]} or {"rev": n, ..., "reset": true}
+    where "mtime" is the signature of the shard file after the change (see utils.file_signature).
+    Several processes may write the same feed: appends happen under a file lock
+    after reading the entries the other processes appended, so revisions stay unique.
+    """
+
+    def __init__(self, path: str, max_entries: int = CHANGE_FEED_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._log = JsonLog(path)
+        self._lock = threading.RLock()
+        self._feed_id: Optional[str] = None
+        self._entries: Optional[List[Dict[str, Any]]] = None
+
+    @property
+    def feed_id(self) -> str:
+        """Id of this feed, changes when the feed file is recreated"""
+        with self._lock:
+            self._refresh()
+            return self._feed_id
+
+    @property
+    def revision(self) -> int:
+        """Revision of the last entry (0 for an empty feed)"""
+        with self._lock:
+            self._refresh()
+            return self._entries[-1]["rev"] if self._entries else 0
+
+    @property
+    def last_signature(self) -> Optional[Tuple[int, int, int]]:
+        """Shard file signature recorded with the last entry"""
+        with self._lock:
+            self._refresh()
+            return _signatur(self._entries[-1]) if self._entries else None
+
+    @contextmanager
+    def locked(self):
+        """
+        Exclusive access to the feed across threads and processes (reentrant)
+        The store holds it while writing the shard and appending, so the shard
+        signature recorded with an entry belongs to the write of that entry.
+        """
+        with self._lock, self._log.locked():
+            self._refresh()
+            yield
+
+    def append(self, ops: List[Dict[str, Any]], signatur: Optional[Tuple[int, int, int]]) -> int:
+        """Record a change of the shard, returns its revision"""
+        return self._append({"ops": ops}, signatur)
+
+    def reset(self, signatur: Optional[Tuple[int, int, int]]) -> int:
+        """Record that the shard changed in an unknown way (consumers must resync)"""
+        return self._append({"reset": True}, signatur)
+
+    def since(self, revision: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Entries after the given revision
+        Returns None if they are no longer available or contain a reset.
+        """
+        with self._lock:
+            self._refresh()
+            return self._since(revision)
+
+    def read_since(self, revision: Optional[int]
+                   ) -> Tuple[str, int, Optional[Tuple[int, int, int]], Optional[List[Dict[str, Any]]]]:
+        """
+        (feed id, revision, shard signature of the last entry, entries after the given revision)
+        All from one read of the file and without the file lock; the entries are None as for since().
+        """
+        with self._lock:
+            self._refresh()
+            eintraege = None if revision is None else self._since(revision)
+            if not self._entries:
+                return self._feed_id, 0, None, eintraege
+            return self._feed_id, self._entries[-1]["rev"], _signatur(self._entries[-1]), eintraege
+
+    def _since(self, revision: int) -> Optional[List[Dict[str, Any]]]:
+        aktuell = self._entries[-1]["rev"] if self._entries else 0
+        if revision == aktuell:
+            return []
+        if revision > aktuell or not self._entries:
+            return None
+        start = revision + 1 - self._entries[0]["rev"]
+        if start < 0 or self._entries[start]["rev"] != revision + 1:
+            return None
+        eintraege = self._entries[start:]
+        if any(e.get("reset") for e in eintraege):
+            return None
+        return eintraege
+
+    def _append(self, eintrag: Dict[str, Any], signatur: Optional[Tuple[int, int, int]]) -> int:
+        with self.locked():
+            eintrag = {
+                "rev": self.revision + 1,
+                "zeit": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "mtime": list(signatur) if signatur is not None else None,
+                **eintrag
+            }
+            self._entries.append(eintrag)
+            if len(self._entries) > self.max_entries:
+                # Keep the newer half, older consumers get a full snapshot
+                del self._entries[:len(self._entries) - self.max_entries // 2]
+                self._log.rewrite([{"feed": self._feed_id}] + self._entries)
+            else:
+                self._log.append([eintrag])
+            return eintrag["rev"]
+
+    def _refresh(self):
+        """Read the entries appended since the last call (by any process)"""
+        self._einlesen(*self._log.read())
+        if self._feed_id is None:
+            with self._log.locked():
+                # Another process may have created the header meanwhile
+                self._einlesen(*self._log.read())
+                if self._feed_id is None:
+                    self._feed_id = os.urandom(16).hex()
+                    self._log.rewrite([{"feed": self._feed_id}] + self._entries)
+
+    def _einlesen(self, ersetzt: bool, zeilen: List[Dict[str, Any]]):
+        if ersetzt or self._entries is None:
+            self._feed_id, self._entries = None, []
+        for zeile in zeilen:
+            if "feed" in zeile:
+                self._feed_id = zeile["feed"]
+            else:
+                self._entries.append(zeile)
+
+def _signatur(eintrag: Dict[str, Any]) -> Optional[Tuple[int, int, int]]:
+    # Stored as a JSON list; older feeds hold the bare mtime, which matches no signature
+    wert = eintrag.get("mtime")
+    return tuple(wert) if isinstance(wert, list) else wert
+
+def sync(room_id: str = DEFAULT_ROOM, since: Optional[int] = None, feed_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Changes of a room for a consumer that knows the given revision
+    Returns {"feed", "revision", "ops"} with a compact diff, or {"feed", "revision", "snapshot"}
+    with the full configuration if since is None, from another feed or no longer available.
+    """
+    from modules.store import get_store
+    aktuell_id, revision, config, eintraege = get_store(room_id).feed_since(since, feed_id)
+    antwort = {"feed": aktuell_id, "revision": revision}
+    if eintraege is None:
+        antwort["snapshot"] = config_to_json(config)
+    else:
+        antwort["ops"] = compact_ops([op for e in eintraege for op in e["ops"]])
+    return antwort
+
+def apply_sync(config: Optional[Dict[str, Any]], antwort: Dict[str, Any]) -> Dict[str, Any]:
+    """Consumer side of sync(): the configuration after applying the answer"""
+    if "snapshot" in antwort:
+        return copy.deepcopy(antwort["snapshot"])
+    return apply_diff(config, antwort["ops"])
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Print the changes of a room since a revision as JSON")
+    parser.add_argument("--room", default=DEFAULT_ROOM)
+    parser.add_argument("--since", type=int, default=None, help="revision known to the consumer")
+    parser.add_argument("--feed", default=None, help="feed id known to the consumer")
+    args = parser.parse_args()
+    print(json.dumps(sync(args.room, args.since, args.feed), indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
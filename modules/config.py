@@ -2,9 +2,21 @@
 Configuration constants for G120 Desk Planning System
 """
 
-# Data file
+# Data file (shard of the default room)
 DATA_FILE = "data/tische_config.json"
 
+# Rooms: registry file and directory for the shards of additional rooms
+ROOMS_FILE = "data/rooms.json"
+ROOMS_DIR = "data/rooms"
+DEFAULT_ROOM = "G120"
+
+# Change feed: one append-only file next to every shard (e.g. data/tische_config.changes.jsonl)
+CHANGE_FEED_SUFFIX = ".changes.jsonl"
+CHANGE_FEED_MAX_ENTRIES = 10000
+
+# Waitlist: one append-only event log next to every shard (e.g. data/tische_config.waitlist.jsonl)
+WAITLIST_SUFFIX = ".waitlist.jsonl"
+
 # Weekdays
 WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
 WEEKDAYS_ALL = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
@@ -19,5 +31,45 @@ DESK_TYPES = ["schedule", "fullbooking", "projekt"]
 # Computer types
 COMPUTER_TYPES = ["GPU", "CPU", "None"]
 
+# Computer usage modes of a booking (the last one is used for desks without computer)
+COMPUTER_MODES = ["Screens Only", "Computer Active (Shutdownable)", "Training Mode (Not Shutdownable)", "No Computer"]
+
 # Screen counts
 SCREEN_COUNTS = [0, 1, 2]
+
+# Desk templates for the bulk editor ("{id}" in the computer name is replaced by the desk id)
+DESK_TEMPLATES = {
+    "GPU workstation, 2 screens, shutdownable": {
+        "typ": "schedule",
+        "rechner": {"vorhanden": True, "typ": "GPU", "name": "WorkStation-{id}", "abschaltbar": True, "bildschirme": 2}
+    },
+    "GPU training station, 2 screens (not shutdownable)": {
+        "typ": "schedule",
+        "rechner": {"vorhanden": True, "typ": "GPU", "name": "Training-{id}", "abschaltbar": False, "bildschirme": 2}
+    },
+    "CPU workstation, 1 screen, shutdownable": {
+        "typ": "schedule",
+        "rechner": {"vorhanden": True, "typ": "CPU", "name": "PC-Lab-{id}", "abschaltbar": True, "bildschirme": 1}
+    },
+    "Screens only, 2 screens": {
+        "typ": "schedule",
+        "rechner": {"vorhanden": False, "typ": "None", "name": "", "abschaltbar": False, "bildschirme": 2}
+    },
+    "Full booking desk, no computer": {
+        "typ": "fullbooking",
+        "rechner": {"vorhanden": False, "typ": "None", "name": "", "abschaltbar": False, "bildschirme": 1}
+    },
+    "Project desk, GPU, 2 screens": {
+        "typ": "projekt",
+        "rechner": {"vorhanden": True, "typ": "GPU", "name": "Project-WS-{id}", "abschaltbar": True, "bildschirme": 2}
+    }
+}
+
+# Integrity checker: repair violations automatically after every write
+INTEGRITY_AUTO_REPAIR = False
+
+# Profiling (opt-in via environment variable G120_PROFILE=1)
+PROFILE_LOG_FILE = "logs/g120_profile.log"
+PROFILE_DUMP_DIR = "logs/profiles"
+PROFILE_SLOW_RERUN_MS = 1000
+PROFILE_HISTORY_SIZE = 50
@@ -0,0 +1,38 @@
+"""
+Debug sidebar panel (only shown with G120_PROFILE=1)
+"""
+import streamlit as st
+from modules import instrumentation
+
+def show_debug_panel():
+    """Show timings of the recent reruns in the sidebar"""
+    reruns = instrumentation.recent_reruns()
+
+    with st.sidebar.expander("🐞 Debug: Timings", expanded=False):
+        if not reruns:
+            st.caption("No completed rerun yet")
+            return
+
+        letzter = reruns[-1]
+        st.metric("Last rerun", f"{letzter.total_ms:.0f} ms")
+
+        # Phases of the last rerun, slowest first
+        for name, ms in sorted(letzter.phases.items(), key=lambda x: -x[1]):
+            st.write(f"`{name}`: {ms:.1f} ms")
+
+        st.caption(
+            f"Storage: {letzter.reads} read(s) / {letzter.bytes_read} B, "
+            f"{letzter.writes} write(s) / {letzter.bytes_written} B"
+        )
+        if letzter.profile_file:
+            st.caption(f"cProfile dump: {letzter.profile_file}")
+
+        st.markdown("**Recent reruns (ms)**")
+        st.line_chart([r.total_ms for r in reruns])
+
+        totals = instrumentation.totals
+        st.caption(
+            f"Process total: {totals['reads']} read(s) / {totals['bytes_read']} B, "
+            f"{totals['writes']} write(s) / {totals['bytes_written']} B"
+        )
+        st.caption(f"Log file: {instrumentation.LOG_FILE}")
@@ -2,21 +2,27 @@
 Desk Configuration Mode (🔧 Desk Configuration Tab)
 """
 import streamlit as st
-from typing import Dict, Any
-from modules.config import DESK_TYPES, COMPUTER_TYPES, SCREEN_COUNTS
-from modules.utils import save_config
+from typing import Dict, Any, Optional
+from modules import instrumentation
+from modules.config import DESK_TYPES, COMPUTER_TYPES, SCREEN_COUNTS, DESK_TEMPLATES
+from modules.desk_templates import (
+    desk_sort_key, ensure_type_fields, validate_desk, desk_to_row, row_to_desk,
+    apply_template, create_desks, next_desk_ids
+)
+from modules.rooms import load_rooms, rooms_by_building, add_room
+from modules.store import get_store
 
+@instrumentation.timed()
 def show_tischbearbeitung_modus(config: Dict, tische: Dict):
     """Show the desk configuration mode"""
     st.header("🔧 Desk Configuration")
-    st.markdown("Here you can configure individual desks.")
+    st.markdown("Here you can configure individual desks, edit many desks at once or apply desk templates.")
     
     # Sidebar for desk selection
     st.sidebar.subheader("Select Desk")
     
     # Sort desks numerically
-    tisch_nummern = sorted([int(t) for t in tische.keys()])
-    tisch_optionen = [str(t) for t in tisch_nummern]
+    tisch_optionen = sorted(tische.keys(), key=desk_sort_key)
     
     selected_tisch = st.sidebar.selectbox(
         "Configure desk:",
@@ -24,12 +30,25 @@ def show_tischbearbeitung_modus(config: Dict, tische: Dict):
         format_func=lambda x: f"Desk {x}"
     )
     
-    if selected_tisch not in tische:
-        st.error(f"Desk {selected_tisch} not found in configuration!")
-        return
+    tab1, tab2, tab3, tab4 = st.tabs(["⚙️ Single Desk", "📝 Bulk Editor", "🧩 Templates", "🏢 Rooms"])
     
-    tisch_data = tische[selected_tisch]
+    with tab1:
+        if selected_tisch not in tische:
+            st.error(f"Desk {selected_tisch} not found in configuration!")
+        else:
+            show_single_desk_editor(selected_tisch, tische[selected_tisch])
+    
+    with tab2:
+        show_bulk_editor(tische)
     
+    with tab3:
+        show_template_editor(tische)
+    
+    with tab4:
+        show_room_editor()
+
+def show_single_desk_editor(selected_tisch: str, tisch_data: Dict):
+    """Show the configuration form for one desk"""
     st.subheader(f"⚙️ Configuration: {tisch_data['name']}")
     st.markdown("---")
     
@@ -52,10 +71,11 @@ def show_tischbearbeitung_modus(config: Dict, tische: Dict):
             )
             
             st.markdown("#### 🖥️ Screen Configuration")
+            aktuelle_bildschirme = tisch_data.get("rechner", {}).get("bildschirme", 0)
             bildschirme = st.selectbox(
                 "Number of Screens:",
                 SCREEN_COUNTS,
-                index=tisch_data.get("rechner", {}).get("bildschirme", 0)
+                index=SCREEN_COUNTS.index(aktuelle_bildschirme) if aktuelle_bildschirme in SCREEN_COUNTS else 0
             )
         
         with col2:
@@ -101,32 +121,24 @@ def show_tischbearbeitung_modus(config: Dict, tische: Dict):
             )
         
         if submit_button:
-            # Update configuration
-            config["tische"][selected_tisch]["name"] = tisch_name
-            config["tische"][selected_tisch]["typ"] = tisch_typ
-            config["tische"][selected_tisch]["rechner"] = {
+            rechner = {
                 "vorhanden": rechner_vorhanden,
-                "typ": rechner_typ if rechner_vorhanden else "Leer",
+                "typ": rechner_typ if rechner_vorhanden else "None",
                 "name": rechner_name if rechner_vorhanden else "",
                 "abschaltbar": abschaltbar if rechner_vorhanden else False,
                 "bildschirme": bildschirme
             }
             
-            # Initialize fields based on desk type
-            if tisch_typ == "schedule":
-                if "buchungen" not in config["tische"][selected_tisch]:
-                    config["tische"][selected_tisch]["buchungen"] = {}
-            elif tisch_typ == "fullbooking":
-                if "gebucht_von" not in config["tische"][selected_tisch]:
-                    config["tische"][selected_tisch]["gebucht_von"] = ""
-            elif tisch_typ == "projekt":
-                if "projekt_name" not in config["tische"][selected_tisch]:
-                    config["tische"][selected_tisch]["projekt_name"] = ""
-                if "gebucht_von" not in config["tische"][selected_tisch]:
-                    config["tische"][selected_tisch]["gebucht_von"] = ""
+            def modify(tisch: Optional[Dict]) -> Optional[Dict]:
+                if tisch is None:
+                    return None
+                # Applied to the current desk so bookings made meanwhile are kept
+                neuer_tisch = {**tisch, "name": tisch_name, "typ": tisch_typ, "rechner": rechner}
+                # Initialize fields based on desk type
+                return ensure_type_fields(neuer_tisch)
             
             # Save configuration
-            save_config(config)
+            get_store(st.session_state.selected_room).modify_desk(selected_tisch, modify)
             
             st.success(f"✅ Configuration for Desk {selected_tisch} saved successfully!")
             st.rerun()
@@ -155,3 +167,135 @@ def show_tischbearbeitung_modus(config: Dict, tische: Dict):
                 st.success("**Status:** Shutdownable")
             else:
                 st.warning("**Status:** Training Mode")
+
+def show_bulk_editor(tische: Dict):
+    """Edit many desks in a table and save them with a single write"""
+    st.markdown("#### 📝 Bulk Editor")
+    st.caption("Edit any number of desks in the table, then save all changes at once.")
+    
+    tisch_ids = sorted(tische.keys(), key=desk_sort_key)
+    zeilen = [desk_to_row(t, tische[t]) for t in tisch_ids]
+    
+    with st.form(key="bulk_editor"):
+        bearbeitet = st.data_editor(
+            zeilen,
+            key="bulk_editor_table",
+            hide_index=True,
+            use_container_width=True,
+            disabled=["id"],
+            column_config={
+                "id": st.column_config.TextColumn("Desk"),
+                "name": st.column_config.TextColumn("Name", required=True),
+                "typ": st.column_config.SelectboxColumn("Booking Type", options=DESK_TYPES, required=True),
+                "computer": st.column_config.CheckboxColumn("Computer"),
+                "computer_typ": st.column_config.SelectboxColumn("Computer Type", options=COMPUTER_TYPES, required=True),
+                "computer_name": st.column_config.TextColumn("Computer Name"),
+                "abschaltbar": st.column_config.CheckboxColumn("Shutdownable"),
+                "bildschirme": st.column_config.SelectboxColumn("Screens", options=SCREEN_COUNTS, required=True)
+            }
+        )
+        submit_button = st.form_submit_button("💾 Save All Changes", type="primary")
+    
+    if submit_button:
+        # Collect changed desks and validate them before writing anything
+        geaendert = {}
+        fehler = []
+        for zeile in bearbeitet:
+            tisch_id = zeile["id"]
+            neuer_tisch = row_to_desk(tische[tisch_id], zeile)
+            if neuer_tisch != tische[tisch_id]:
+                fehler.extend(validate_desk(tisch_id, neuer_tisch))
+                geaendert[tisch_id] = neuer_tisch
+        
+        if fehler:
+            for meldung in fehler:
+                st.error(meldung)
+        elif not geaendert:
+            st.info("ℹ️ No changes to save")
+        else:
+            zeilen_nach_id = {zeile["id"]: zeile for zeile in bearbeitet if zeile["id"] in geaendert}
+            # Apply the rows to the current desks so bookings made meanwhile are kept
+            get_store(st.session_state.selected_room).modify_desks(lambda aktuell: {
+                t: row_to_desk(aktuell[t], zeile) for t, zeile in zeilen_nach_id.items() if t in aktuell
+            })
+            st.success(f"✅ {len(geaendert)} desk(s) saved successfully!")
+            st.rerun()
+
+def show_template_editor(tische: Dict):
+    """Apply desk templates to existing desks or create new desks from a template"""
+    st.markdown("#### 🧩 Desk Templates")
+    
+    template_name = st.selectbox("Template:", list(DESK_TEMPLATES), key="template_select")
+    template = DESK_TEMPLATES[template_name]
+    rechner = template["rechner"]
+    if rechner["vorhanden"]:
+        rechner_info = f"{rechner['typ']}, {'shutdownable' if rechner['abschaltbar'] else 'Training Mode'}"
+    else:
+        rechner_info = "no computer"
+    st.caption(f"Booking type: {template['typ']} | Computer: {rechner_info} | Screens: {rechner['bildschirme']}")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("**Apply to existing desks**")
+        auswahl = st.multiselect(
+            "Desks:",
+            sorted(tische.keys(), key=desk_sort_key),
+            format_func=lambda x: f"Desk {x}",
+            key="template_desks"
+        )
+        if st.button("🧩 Apply Template", disabled=not auswahl, use_container_width=True):
+            geaendert = {t: apply_template(t, tische[t], template_name) for t in auswahl}
+            fehler = [m for t, neu in geaendert.items() for m in validate_desk(t, neu)]
+            if fehler:
+                for meldung in fehler:
+                    st.error(meldung)
+            else:
+                get_store(st.session_state.selected_room).modify_desks(lambda aktuell: {
+                    t: apply_template(t, aktuell[t], template_name) for t in auswahl if t in aktuell
+                })
+                st.success(f"✅ Template applied to {len(geaendert)} desk(s)!")
+                st.rerun()
+    
+    with col2:
+        st.markdown("**Create new desks**")
+        anzahl = st.number_input("Number of desks:", min_value=1, max_value=100, value=1, key="template_count")
+        neue_ids = next_desk_ids(tische, int(anzahl))
+        st.caption(f"New desks: {neue_ids[0]} - {neue_ids[-1]}" if len(neue_ids) > 1 else f"New desk: {neue_ids[0]}")
+        if st.button("➕ Create Desks", use_container_width=True):
+            # Ids are taken from the current desks so concurrently created desks are not overwritten
+            get_store(st.session_state.selected_room).modify_desks(
+                lambda aktuell: create_desks(next_desk_ids(aktuell, int(anzahl)), template_name))
+            st.success(f"✅ {int(anzahl)} desk(s) created!")
+            st.rerun()
+
+def show_room_editor():
+    """List rooms per building and add new rooms"""
+    st.markdown("#### 🏢 Rooms")
+    
+    rooms = load_rooms()
+    for gebaeude, room_ids in sorted(rooms_by_building().items()):
+        st.markdown(f"**{gebaeude or 'No building'}**")
+        for room_id in sorted(room_ids):
+            st.write(f"- {rooms[room_id]['name']} (`{room_id}`, {rooms[room_id]['file']})")
+    
+    st.markdown("---")
+    with st.form(key="add_room"):
+        st.markdown("**Add Room**")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            room_id = st.text_input("Room ID:", placeholder="e.g. G121")
+        with col2:
+            room_name = st.text_input("Display Name:", placeholder="e.g. G121 Lab")
+        with col3:
+            building = st.text_input("Building:", placeholder="e.g. Building G")
+        submit_button = st.form_submit_button("➕ Add Room", type="primary")
+    
+    if submit_button:
+        try:
+            add_room(room_id.strip(), room_name.strip(), building.strip())
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.success(f"✅ Room {room_id} added!")
+            st.rerun()
@@ -3,10 +3,14 @@ Desk Planning Mode (📋 Desk Planning Tab)
 """
 import streamlit as st
 from typing import Dict, Any
-from datetime import datetime
-from modules.config import WEEKDAYS, WEEKDAYS_ALL, TIMESLOTS_BOOKING, TIMESLOTS
-from modules.utils import save_config
+from modules import instrumentation
+from modules.bookings import new_booking, add_bookings, delete_booking, update_desk_fields
+from modules.config import WEEKDAYS, TIMESLOTS_BOOKING, TIMESLOTS, COMPUTER_MODES, COMPUTER_TYPES, SCREEN_COUNTS
+from modules.desk_templates import desk_sort_key
+from modules.models import Weekday, bookings_of, invalid_bookings, weekly_occupancy
+from modules.waitlist import get_waitlist, notify_freed
 
+@instrumentation.timed()
 def show_tischplanung_modus(config: Dict, tische: Dict):
     """Show the Desk Planning mode (original functionality)"""
     st.header("📋 Desk Planning")
@@ -15,8 +19,7 @@ def show_tischplanung_modus(config: Dict, tische: Dict):
     st.sidebar.subheader("Desk Selection")
     
     # Sort desks numerically
-    tisch_nummern = sorted([int(t) for t in tische.keys()])
-    tisch_optionen = [str(t) for t in tisch_nummern]
+    tisch_optionen = sorted(tische.keys(), key=desk_sort_key)
     
     # If switched from room view, use pre-selected desk
     default_index = 0
@@ -108,8 +111,7 @@ def show_fullbooking_view(tisch_id: str, tisch_data: Dict, config: Dict):
         st.write("")
         st.write("")
         if st.button("💾 Save", type="primary"):
-            config["tische"][tisch_id]["gebucht_von"] = neuer_name
-            save_config(config)
+            update_desk_fields(st.session_state.selected_room, tisch_id, {"gebucht_von": neuer_name})
             st.success("Booking saved!")
             st.rerun()
     
@@ -144,9 +146,10 @@ def show_projekt_view(tisch_id: str, tisch_data: Dict, config: Dict):
     col_btn1, col_btn2, col_btn3 = st.columns([2, 1, 2])
     with col_btn2:
         if st.button("💾 Save", type="primary", use_container_width=True):
-            config["tische"][tisch_id]["projekt_name"] = neuer_projekt_name
-            config["tische"][tisch_id]["gebucht_von"] = neuer_ansprechpartner
-            save_config(config)
+            update_desk_fields(st.session_state.selected_room, tisch_id, {
+                "projekt_name": neuer_projekt_name,
+                "gebucht_von": neuer_ansprechpartner
+            })
             st.success("Project booking saved!")
             st.rerun()
     
@@ -168,7 +171,7 @@ def show_schedule_view(tisch_id: str, tisch_data: Dict, config: Dict):
     buchungen = tisch_data.get("buchungen", {})
     
     # Tabs for different views
-    tab1, tab2, tab3 = st.tabs(["📊 Weekly Overview", "➕ New Booking", "📋 All Bookings"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Weekly Overview", "➕ New Booking", "📋 All Bookings", "⏳ Waitlist"])
     
     with tab1:
         show_weekly_view(buchungen)
@@ -178,29 +181,25 @@ def show_schedule_view(tisch_id: str, tisch_data: Dict, config: Dict):
     
     with tab3:
         show_all_bookings(tisch_id, buchungen, config)
+    
+    with tab4:
+        show_waitlist(tisch_id, tisch_data, buchungen)
 
 def show_weekly_view(buchungen: Dict):
     """Show a visual weekly overview"""
     st.markdown("### 📅 Weekly Schedule")
     
-    for tag in WEEKDAYS_ALL:
-        st.markdown(f"**{tag}**")
-        
-        tag_buchungen = {slot: [] for slot in TIMESLOTS}
-        
-        # Collect all bookings for this day
-        for buchung_key, buchung in buchungen.items():
-            if buchung.get("tag") == tag:
-                slot = buchung.get("zeitslot")
-                if slot in tag_buchungen:
-                    tag_buchungen[slot].append(buchung.get("person", "Unknown"))
+    belegung = weekly_occupancy(buchungen)
+    
+    for tag in Weekday:
+        st.markdown(f"**{tag.label}**")
         
         # Display bookings in grid view
         cols = st.columns(4)
         for idx, slot in enumerate(TIMESLOTS):
             col_idx = idx % 4
             with cols[col_idx]:
-                personen = tag_buchungen[slot]
+                personen = belegung.get((tag, idx))
                 if personen:
                     st.success(f"**{slot}**\n\n{', '.join(personen)}")
                 else:
@@ -230,10 +229,10 @@ def add_new_booking(tisch_id: str, buchungen: Dict, config: Dict):
         if rechner_vorhanden:
             rechner_modus = st.selectbox(
                 "💻 Computer Usage:",
-                ["Screens Only", "Computer Active (Shutdownable)", "Training Mode (Not Shutdownable)"]
+                COMPUTER_MODES[:3]
             )
         else:
-            rechner_modus = "No Computer"
+            rechner_modus = COMPUTER_MODES[3]
             st.info("ℹ️ This desk has no computer")
     
     notizen = st.text_area("📝 Notes (optional):", placeholder="Additional information...", key="notizen")
@@ -254,16 +253,13 @@ def add_new_booking(tisch_id: str, buchungen: Dict, config: Dict):
     </style>
     """, unsafe_allow_html=True)
     
+    # Check which slots are already booked
+    gebuchte_slots = {(buchung.tag.label, buchung.zeitslot) for buchung in bookings_of(buchungen)}
+    
     # Create button grid for each weekday
     for tag in WEEKDAYS:
         st.markdown(f"#### {tag}")
         
-        # Check which slots are already booked
-        gebuchte_slots = set()
-        for buchung_key, buchung in buchungen.items():
-            if buchung.get("tag") == tag:
-                gebuchte_slots.add(buchung.get("zeitslot"))
-        
         # Create buttons in columns (5 buttons per row)
         cols = st.columns(5)
         for idx, zeitslot in enumerate(TIMESLOTS_BOOKING):
@@ -272,7 +268,7 @@ def add_new_booking(tisch_id: str, buchungen: Dict, config: Dict):
             
             with cols[col_idx]:
                 # Determine button status
-                is_gebucht = zeitslot in gebuchte_slots
+                is_gebucht = (tag, zeitslot) in gebuchte_slots
                 is_selected = slot_key in st.session_state.selected_slots
                 
                 # Button label with time
@@ -345,32 +341,23 @@ def add_new_booking(tisch_id: str, buchungen: Dict, config: Dict):
                 st.error("Please select at least one time slot!")
             else:
                 # Create bookings for all selected slots
-                erfolg_count = 0
-                for slot_key in st.session_state.selected_slots:
-                    tag, zeitslot = slot_key.rsplit('_', 1)
-                    
-                    # Create unique ID
-                    buchung_id = f"{tag}_{zeitslot}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
-                    
-                    buchungen[buchung_id] = {
-                        "person": person,
-                        "tag": tag,
-                        "zeitslot": zeitslot,
-                        "rechner_modus": rechner_modus if rechner_vorhanden else "No Computer",
-                        "notizen": notizen,
-                        "erstellt_am": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
-                    erfolg_count += 1
-                
-                # Save configuration
-                config["tische"][tisch_id]["buchungen"] = buchungen
-                save_config(config)
-                
-                # Reset selection
-                st.session_state.selected_slots = set()
+                neue_buchungen = dict(
+                    new_booking(person, *slot_key.rsplit('_', 1),
+                                rechner_modus if rechner_vorhanden else COMPUTER_MODES[3], notizen)
+                    for slot_key in st.session_state.selected_slots
+                )
                 
-                st.success(f"✅ {erfolg_count} Booking(s) for {person} created successfully!")
-                st.rerun()
+                # Save atomically, slots booked meanwhile by someone else are rejected
+                konflikte = add_bookings(st.session_state.selected_room, tisch_id, neue_buchungen)
+                if konflikte:
+                    st.session_state.selected_slots -= {f"{tag}_{zeitslot}" for tag, zeitslot in konflikte}
+                    st.error("Already booked in the meantime: " + ", ".join(f"{t} {z}" for t, z in sorted(konflikte)))
+                else:
+                    # Reset selection
+                    st.session_state.selected_slots = set()
+                    
+                    st.success(f"✅ {len(neue_buchungen)} Booking(s) for {person} created successfully!")
+                    st.rerun()
 
 def show_all_bookings(tisch_id: str, buchungen: Dict, config: Dict):
     """Show all bookings with delete option"""
@@ -380,31 +367,112 @@ def show_all_bookings(tisch_id: str, buchungen: Dict, config: Dict):
         st.info("ℹ️ No bookings yet")
         return
     
-    # Sort bookings by day and time slot
-    sorted_buchungen = sorted(
-        buchungen.items(),
-        key=lambda x: (WEEKDAYS_ALL.index(x[1].get("tag", "Monday")), x[1].get("zeitslot", ""))
-    )
-    
-    for buchung_id, buchung in sorted_buchungen:
+    # Bookings come sorted by day and time slot
+    for buchung in bookings_of(buchungen):
+        buchung_id = buchung.key
+        # An unknown computer mode is kept as stored
+        rechner_modus = buchung.get("rechner_modus", "N/A")
         with st.expander(
-            f"🕐 {buchung.get('tag')} | {buchung.get('zeitslot')} - {buchung.get('person')}"
+            f"🕐 {buchung.tag.label} | {buchung.zeitslot} - {buchung.person or 'Unknown'}"
         ):
             col1, col2 = st.columns([4, 1])
             
             with col1:
-                st.write(f"**Person:** {buchung.get('person')}")
-                st.write(f"**Day:** {buchung.get('tag')}")
-                st.write(f"**Time Slot:** {buchung.get('zeitslot')}")
-                st.write(f"**Computer Mode:** {buchung.get('rechner_modus', 'N/A')}")
-                if buchung.get('notizen'):
-                    st.write(f"**Notes:** {buchung.get('notizen')}")
-                st.caption(f"Created: {buchung.get('erstellt_am', 'Unknown')}")
+                st.write(f"**Person:** {buchung.person or 'Unknown'}")
+                st.write(f"**Day:** {buchung.tag.label}")
+                st.write(f"**Time Slot:** {buchung.zeitslot}")
+                st.write(f"**Computer Mode:** {rechner_modus}")
+                if buchung.notizen:
+                    st.write(f"**Notes:** {buchung.notizen}")
+                st.caption(f"Created: {buchung.erstellt_am or 'Unknown'}")
             
             with col2:
                 if st.button("🗑️ Delete", key=f"delete_{buchung_id}"):
-                    del buchungen[buchung_id]
-                    config["tische"][tisch_id]["buchungen"] = buchungen
-                    save_config(config)
+                    if delete_booking(st.session_state.selected_room, tisch_id, buchung_id) is not None:
+                        # Hand the freed slot to the next person on the waitlist
+                        notify_freed(st.session_state.selected_room, tisch_id, buchung.tag.label, buchung.zeitslot)
+                    st.success("Booking deleted!")
+                    st.rerun()
+
+    # Bookings with a missing or unknown day/time slot can only be shown raw and deleted
+    for buchung_id, daten in invalid_bookings(buchungen):
+        with st.expander(f"⚠️ Invalid booking {buchung_id}"):
+            col1, col2 = st.columns([4, 1])
+
+            with col1:
+                st.warning("Unknown day or time slot - this booking is ignored in the overview")
+                st.json(daten)
+
+            with col2:
+                if st.button("🗑️ Delete", key=f"delete_{buchung_id}"):
+                    delete_booking(st.session_state.selected_room, tisch_id, buchung_id)
                     st.success("Booking deleted!")
                     st.rerun()
+
+def show_waitlist(tisch_id: str, tisch_data: Dict, buchungen: Dict):
+    """Join the waitlist for a slot and show the waiting entries"""
+    st.markdown("### ⏳ Waitlist")
+    st.markdown("Wait for a time slot. If a matching desk is free it is booked right away, "
+                "otherwise the slot is assigned automatically as soon as a booking is deleted.")
+    
+    waitlist = get_waitlist(st.session_state.selected_room)
+    gebuchte_slots = {(b.tag.label, b.zeitslot) for b in bookings_of(buchungen)}
+    slots = [(tag, zeitslot) for tag in WEEKDAYS for zeitslot in TIMESLOTS_BOOKING]
+    
+    with st.form(key=f"waitlist_{tisch_id}"):
+        col1, col2 = st.columns(2)
+        with col1:
+            person = st.text_input("👤 Person Name:", placeholder="Max Mustermann")
+            slot = st.selectbox(
+                "📅 Time Slot:",
+                slots,
+                format_func=lambda x: f"{x[0]} {x[1]}" + (" (booked here)" if x in gebuchte_slots else "")
+            )
+            notizen = st.text_input("📝 Notes (optional):")
+        with col2:
+            ziel = st.radio("Wait for:", ["This desk", "Any desk matching my requirements"])
+            rechner_typ = st.selectbox("💻 Computer Type:", ["Any"] + [t for t in COMPUTER_TYPES if t != "None"])
+            min_bildschirme = st.selectbox("🖥️ Min. Screens:", SCREEN_COUNTS)
+            rechner_modus = st.selectbox("💻 Computer Usage:", COMPUTER_MODES[:3])
+        
+        submit_button = st.form_submit_button("⏳ Join Waitlist", type="primary")
+    
+    if submit_button:
+        if not person:
+            st.error("Please enter a name!")
+        else:
+            tag, zeitslot = slot
+            eintrag = waitlist.join(
+                person, tag, zeitslot,
+                tisch_id=tisch_id if ziel == "This desk" else None,
+                rechner_typ=None if rechner_typ == "Any" else rechner_typ,
+                min_bildschirme=min_bildschirme,
+                rechner_modus=rechner_modus,
+                notizen=notizen
+            )
+            if "gebucht" in eintrag:
+                st.success(f"✅ Desk {eintrag['gebucht']} was free and is now booked for {person} ({tag} {zeitslot})")
+            else:
+                st.success(f"✅ {person} is on the waitlist for {tag} {zeitslot}")
+            st.rerun()
+    
+    st.markdown("---")
+    st.markdown("#### Waiting")
+    
+    eintraege = waitlist.entries(tisch_id)
+    if not eintraege:
+        st.info("ℹ️ Nobody is waiting")
+        return
+    
+    for eintrag in eintraege:
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            if eintrag.get("tisch") is None:
+                anforderung = f"any desk ({eintrag.get('rechner_typ') or 'any computer'}, ≥{eintrag.get('min_bildschirme', 0)} screens)"
+            else:
+                anforderung = f"Desk {eintrag['tisch']}"
+            st.write(f"⏳ **{eintrag['person']}** – {eintrag['tag']} {eintrag['zeitslot']} – {anforderung}")
+        with col2:
+            if st.button("❌ Leave", key=f"leave_waitlist_{eintrag['id']}"):
+                waitlist.leave(eintrag["id"])
+                st.rerun()
@@ -0,0 +1,98 @@
+"""
+Desk templates and validation for bulk desk configuration
+
+Data layer only (no Streamlit): the bulk editor and templates in
+desk_config.py build complete desk dicts with these helpers and commit
+them with a single store write.
+"""
+import copy
+from typing import Dict, Any, Iterable, List
+from modules.config import DESK_TYPES, COMPUTER_TYPES, SCREEN_COUNTS, DESK_TEMPLATES
+
+def desk_sort_key(desk_id: str) -> tuple:
+    """Sort numeric desk ids numerically, others alphabetically after them"""
+    return (0, int(desk_id), "") if desk_id.isdigit() else (1, 0, desk_id)
+
+def ensure_type_fields(tisch: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the fields required by the desk type (in place)"""
+    tisch_typ = tisch.get("typ")
+    if tisch_typ == "schedule":
+        tisch.setdefault("buchungen", {})
+    elif tisch_typ == "fullbooking":
+        tisch.setdefault("gebucht_von", "")
+    elif tisch_typ == "projekt":
+        tisch.setdefault("projekt_name", "")
+        tisch.setdefault("gebucht_von", "")
+    return tisch
+
+def validate_desk(desk_id: str, tisch: Dict[str, Any]) -> List[str]:
+    """Check a desk configuration, returns a list of error messages"""
+    fehler = []
+    if not str(tisch.get("name", "")).strip():
+        fehler.append(f"Desk {desk_id}: name must not be empty")
+    if tisch.get("typ") not in DESK_TYPES:
+        fehler.append(f"Desk {desk_id}: booking type must be one of {', '.join(DESK_TYPES)}")
+
+    rechner = tisch.get("rechner", {})
+    if not isinstance(rechner.get("vorhanden"), bool):
+        fehler.append(f"Desk {desk_id}: computer availability must be true or false")
+    if rechner.get("typ") not in COMPUTER_TYPES:
+        fehler.append(f"Desk {desk_id}: computer type must be one of {', '.join(COMPUTER_TYPES)}")
+    elif rechner.get("vorhanden") is False and rechner.get("typ") != "None":
+        fehler.append(f"Desk {desk_id}: a desk without computer must have computer type None")
+    if rechner.get("bildschirme") not in SCREEN_COUNTS:
+        fehler.append(f"Desk {desk_id}: number of screens must be one of {', '.join(map(str, SCREEN_COUNTS))}")
+    return fehler
+
+def desk_to_row(desk_id: str, tisch: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a desk into a row of the bulk editor table"""
+    rechner = tisch.get("rechner", {})
+    return {
+        "id": desk_id,
+        "name": tisch.get("name", f"Desk {desk_id}"),
+        "typ": tisch.get("typ", "schedule"),
+        "computer": rechner.get("vorhanden", False),
+        "computer_typ": rechner.get("typ", "None"),
+        "computer_name": rechner.get("name", ""),
+        "abschaltbar": rechner.get("abschaltbar", False),
+        "bildschirme": rechner.get("bildschirme", 0)
+    }
+
+def row_to_desk(tisch: Dict[str, Any], row: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of the desk with the values of a bulk editor row"""
+    neuer_tisch = dict(tisch)
+    neuer_tisch["name"] = row["name"]
+    neuer_tisch["typ"] = row["typ"]
+    # Without a computer the other computer fields are reset, like in the single desk form
+    vorhanden = bool(row["computer"])
+    neuer_tisch["rechner"] = {
+        "vorhanden": vorhanden,
+        "typ": row["computer_typ"] if vorhanden else "None",
+        "name": (row["computer_name"] or "") if vorhanden else "",
+        "abschaltbar": bool(row["abschaltbar"]) if vorhanden else False,
+        "bildschirme": row["bildschirme"]
+    }
+    return ensure_type_fields(neuer_tisch)
+
+def apply_template(desk_id: str, tisch: Dict[str, Any], template_name: str) -> Dict[str, Any]:
+    """Return a copy of the desk with the template applied (name and bookings are kept)"""
+    template = DESK_TEMPLATES[template_name]
+    neuer_tisch = dict(tisch)
+    neuer_tisch["typ"] = template["typ"]
+    rechner = copy.deepcopy(template["rechner"])
+    rechner["name"] = rechner["name"].format(id=desk_id)
+    neuer_tisch["rechner"] = rechner
+    return ensure_type_fields(neuer_tisch)
+
+def create_desks(desk_ids: Iterable[str], template_name: str) -> Dict[str, Dict[str, Any]]:
+    """Create new desks from a template"""
+    return {
+        desk_id: apply_template(desk_id, {"name": f"Desk {desk_id}"}, template_name)
+        for desk_id in desk_ids
+    }
+
+def next_desk_ids(tische: Dict[str, Any], count: int) -> List[str]:
+    """The next count free numeric desk ids after the highest existing one"""
+    nummern = [int(t) for t in tische if t.isdigit()]
+    start = max(nummern) + 1 if nummern else 0
+    return [str(n) for n in range(start, start + count)]
@@ -0,0 +1,177 @@
+"""
+Opt-in timing instrumentation for G120 Desk Planning System
+
+Enable with the environment variable G120_PROFILE=1. Every rerun of main()
+then records the time of each phase and mode function and the number of
+storage reads/writes and bytes. Results go to a rolling log file and are
+shown in the debug sidebar panel. With G120_PROFILE_CPROFILE=1 reruns also
+run under cProfile (one at a time, reruns of other sessions meanwhile are
+only timed) and reruns slower than G120_PROFILE_SLOW_MS are dumped to
+PROFILE_DUMP_DIR.
+
+When disabled, phase() returns a shared no-op context manager and timed()
+returns the function unchanged, so the overhead is a single flag check.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Optional
+from modules.config import PROFILE_LOG_FILE, PROFILE_DUMP_DIR, PROFILE_SLOW_RERUN_MS, PROFILE_HISTORY_SIZE
+
+ENABLED = os.environ.get("G120_PROFILE", "") not in ("", "0")
+CPROFILE = ENABLED and os.environ.get("G120_PROFILE_CPROFILE", "") not in ("", "0")
+SLOW_RERUN_MS = float(os.environ.get("G120_PROFILE_SLOW_MS", PROFILE_SLOW_RERUN_MS))
+LOG_FILE = os.environ.get("G120_PROFILE_LOG", PROFILE_LOG_FILE)
+
+_NOOP = nullcontext()
+
+class RerunStats:
+    """Measurements of a single rerun"""
+    __slots__ = ("started", "total_ms", "phases", "reads", "writes", "bytes_read", "bytes_written", "profile_file")
+
+    def __init__(self):
+        self.started = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.total_ms = 0.0
+        self.phases: Dict[str, float] = {}
+        self.reads = 0
+        self.writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.profile_file: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+_local = threading.local()
+_history = deque(maxlen=PROFILE_HISTORY_SIZE)
+_history_lock = threading.Lock()
+_logger = None
+
+# Held by the rerun running under cProfile. Only one profiler can be active per process
+# (Python 3.12+ raises ValueError for a second one), concurrent reruns run without it.
+_profiler_lock = threading.Lock()
+
+# Storage counters of the whole process (including writes outside of reruns)
+totals = {"reads": 0, "writes": 0, "bytes_read": 0, "bytes_written": 0}
+
+def _current() -> Optional[RerunStats]:
+    return getattr(_local, "stats", None)
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        # Imported lazily, logging is not needed when instrumentation is disabled
+        import logging
+        from logging.handlers import RotatingFileHandler
+        logger = logging.getLogger("g120.profile")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+        handler = RotatingFileHandler(LOG_FILE, maxBytes=1024 * 1024, backupCount=3, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        _logger = logger
+    return _logger
+
+@contextmanager
+def _rerun():
+    stats = RerunStats()
+    _local.stats = stats
+    profiler = None
+    if CPROFILE and _profiler_lock.acquire(blocking=False):
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active (e.g. the app itself runs under a profiler)
+            profiler = None
+            _profiler_lock.release()
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        if profiler:
+            profiler.disable()
+            _profiler_lock.release()
+        stats.total_ms = round((time.perf_counter() - start) * 1000, 2)
+        _local.stats = None
+
+        if profiler and stats.total_ms >= SLOW_RERUN_MS:
+            os.makedirs(PROFILE_DUMP_DIR, exist_ok=True)
+            stats.profile_file = os.path.join(
+                PROFILE_DUMP_DIR, f"rerun_{datetime.now().strftime('%Y%m%d%H%M%S%f')}.prof")
+            profiler.dump_stats(stats.profile_file)
+
+        with _history_lock:
+            _history.append(stats)
+        _get_logger().info(json.dumps(stats.to_dict()))
+
+def rerun():
+    """Context manager around one rerun of main()"""
+    if not ENABLED:
+        return _NOOP
+    return _rerun()
+
+@contextmanager
+def _phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current()
+        if stats is not None:
+            stats.phases[name] = round(stats.phases.get(name, 0.0) + (time.perf_counter() - start) * 1000, 2)
+
+def phase(name: str):
+    """Context manager timing one phase of the current rerun"""
+    if not ENABLED:
+        return _NOOP
+    return _phase(name)
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator timing every call of a function as a phase"""
+    def decorator(func: Callable) -> Callable:
+        if not ENABLED:
+            return func
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _phase(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count_read(path: str):
+    """Count a storage read of the given file"""
+    if ENABLED:
+        _count("reads", "bytes_read", path)
+
+def count_write(path: str):
+    """Count a storage write of the given file"""
+    if ENABLED:
+        _count("writes", "bytes_written", path)
+
+def _count(counter: str, byte_counter: str, path: str):
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    with _history_lock:
+        totals[counter] += 1
+        totals[byte_counter] += size
+    stats = _current()
+    if stats is not None:
+        setattr(stats, counter, getattr(stats, counter) + 1)
+        setattr(stats, byte_counter, getattr(stats, byte_counter) + size)
+
+def recent_reruns() -> List[RerunStats]:
+    """Completed reruns, oldest first"""
+    with _history_lock:
+        return list(_history)
@@ -0,0 +1,391 @@
+"""
+Integrity checker for G120 Desk Planning System
+
+A set of rules over single desks: every rule only looks at one desk, so
+the whole store is checked desk by desk and after a write only the
+touched desks are checked again. Violations are reported and, where the
+rule knows a safe fix, can be repaired.
+
+Offline: python -m modules.integrity [--room G120 | --all | --file plan.json] [--fix] [--json]
+Online:  get_monitor(room_id) subscribes to the room's store and keeps the
+         violations up to date incrementally (INTEGRITY_AUTO_REPAIR repairs them).
+"""
+import json
+import sys
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+from modules.config import (
+    DESK_TYPES, COMPUTER_TYPES, SCREEN_COUNTS, WEEKDAYS_ALL, TIMESLOTS, DEFAULT_ROOM, INTEGRITY_AUTO_REPAIR
+)
+from modules.models import BookingMap
+from modules.utils import DESK_TYPE_MAPPING, COMPUTER_TYPE_MAPPING, WEEKDAY_MAPPING
+
+_WEEKDAYS = frozenset(WEEKDAYS_ALL)
+_TIMESLOTS = frozenset(TIMESLOTS)
+
+@dataclass
+class Violation:
+    """A single rule violation"""
+    __slots__ = ("regel", "tisch", "buchung", "meldung", "reparierbar")
+    regel: str
+    tisch: str
+    # Booking key if the violation concerns a single booking
+    buchung: Optional[str]
+    meldung: str
+    reparierbar: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+def _rechner(tisch: Dict[str, Any]) -> Dict[str, Any]:
+    # A computer entry that is no mapping is left alone by the rules
+    rechner = tisch.get("rechner", {})
+    return rechner if isinstance(rechner, Mapping) else {}
+
+def _buchungen(tisch: Dict[str, Any]) -> Dict[str, Any]:
+    buchungen = tisch.get("buchungen", {})
+    return buchungen if isinstance(buchungen, Mapping) else {}
+
+def _readable(buchung: Any) -> bool:
+    """Whether the slot rules can read a booking: a mapping with hashable day and time slot"""
+    if not isinstance(buchung, Mapping):
+        return False
+    try:
+        hash((buchung.get("tag"), buchung.get("zeitslot")))
+    except TypeError:
+        return False
+    return True
+
+# --- Rules: check(tisch_id, tisch) -> violations, repair(tisch) modifies a copy of the desk in place ---
+
+def _check_desk_type(tisch_id: str, tisch: Dict[str, Any]) -> List[Violation]:
+    typ = tisch.get("typ")
+    if typ in DESK_TYPES:
+        return []
+    return [Violation("desk_type", tisch_id, None, f"Desk {tisch_id}: unknown booking type {typ!r}",
+                      isinstance(typ, str) and typ in DESK_TYPE_MAPPING)]
+
+def _repair_desk_type(tisch: Dict[str, Any]):
+    typ = tisch.get("typ")
+    if isinstance(typ, str) and typ in DESK_TYPE_MAPPING:
+        tisch["typ"] = DESK_TYPE_MAPPING[typ]
+
+def _check_computer_type(tisch_id: str, tisch: Dict[str, Any]) -> List[Violation]:
+    typ = _rechner(tisch).get("typ", "None")
+    if typ in COMPUTER_TYPES:
+        return []
+    return [Violation("computer_type", tisch_id, None, f"Desk {tisch_id}: unknown computer type {typ!r}", True)]
+
+def _repair_computer_type(tisch: Dict[str, Any]):
+    rechner = tisch["rechner"]
+    # "Leer" and other unknown types mean no usable computer type
+    typ = rechner.get("typ")
+    rechner["typ"] = COMPUTER_TYPE_MAPPING.get(typ, "None") if isinstance(typ, str) else "None"
+
+def _valid_screen_count(bildschirme: Any) -> bool:
+    # bool is an int subclass, True would pass as 1
+    return not isinstance(bildschirme, bool) and bildschirme in SCREEN_COUNTS
+
+def _check_screen_count(tisch_id: str, tisch: Dict[str, Any]) -> List[Violation]:
+    bildschirme = _rechner(tisch).get("bildschirme", 0)
+    if _valid_screen_count(bildschirme):
+        return []
+    return [Violation("screen_count", tisch_id, None,
+                      f"Desk {tisch_id}: number of screens {bildschirme!r} not in {SCREEN_COUNTS}", True)]
+
+def _repair_screen_count(tisch: Dict[str, Any]):
+    rechner = tisch["rechner"]
+    bildschirme = rechner.get("bildschirme")
+    if isinstance(bildschirme, int) and not isinstance(bildschirme, bool):
+        rechner["bildschirme"] = min(max(bildschirme, min(SCREEN_COUNTS)), max(SCREEN_COUNTS))
+    else:
+        rechner["bildschirme"] = SCREEN_COUNTS[0]
+
+def _check_booking_slot(tisch_id: str, tisch: Dict[str, Any]) -> List[Violation]:
+    verstoesse = []
+    buchungen = _buchungen(tisch)
+    if isinstance(buchungen, BookingMap):
+        # The store parsed these, only the bookings it could not parse can have an unknown day or slot
+        buchungen = buchungen.invalid or {}
+    for key, buchung in buchungen.items():
+        if not _readable(buchung):
+            verstoesse.append(Violation("booking_slot", tisch_id, key,
+                                        f"Desk {tisch_id}: booking {key} has no readable day and time slot: "
+                                        f"{buchung!r}", False))
+            continue
+        tag, zeitslot = buchung.get("tag"), buchung.get("zeitslot")
+        if tag not in _WEEKDAYS:
+            verstoesse.append(Violation("booking_slot", tisch_id, key,
+                                        f"Desk {tisch_id}: booking {key} has unknown day {tag!r}",
+                                        tag in WEEKDAY_MAPPING))
+        if zeitslot not in _TIMESLOTS:
+            verstoesse.append(Violation("booking_slot", tisch_id, key,
+                                        f"Desk {tisch_id}: booking {key} has unknown time slot {zeitslot!r}", False))
+    return verstoesse
+
+def _repair_booking_slot(tisch: Dict[str, Any]):
+    buchungen = tisch["buchungen"]
+    for key, buchung in buchungen.items():
+        if _readable(buchung) and buchung.get("tag") in WEEKDAY_MAPPING:
+            buchungen[key] = {**buchung, "tag": WEEKDAY_MAPPING[buchung["tag"]]}
+
+def _check_booking_on_full_desk(tisch_id: str, tisch: Dict[str, Any]) -> List[Violation]:
+    typ = tisch.get("typ", "schedule")
+    if typ == "schedule" or typ not in DESK_TYPES:
+        return []
+    return [
+        Violation("booking_on_full_desk", tisch_id, key,
+                  f"Desk {tisch_id}: time slot booking {key} on a {typ} desk", True)
+        for key in _buchungen(tisch)
+    ]
+
+def _repair_booking_on_full_desk(tisch: Dict[str, Any]):
+    tisch.pop("buchungen", None)
+
+def _double_bookings(buchungen: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Keys of all bookings of a slot except the first one (by creation time, then key)"""
+    eintraege = buchungen.items()
+    if isinstance(buchungen, BookingMap):
+        # Sorted by day and slot, only neighbours can share a slot; the keys are built for those only
+        b = buchungen.bookings
+        geteilt = [i for i in range(1, len(b)) if b[i].tag == b[i - 1].tag and b[i].slot == b[i - 1].slot]
+        nummern = sorted({n for i in geteilt for n in (i - 1, i)})
+        eintraege = [(b[n].key, b[n]) for n in nummern] + list((buchungen.invalid or {}).items())
+    erste: Dict[Tuple[Any, Any], Tuple[str, str]] = {}
+    doppelt = []
+    for key, buchung in eintraege:
+        if not _readable(buchung):
+            # Reported by the booking_slot rule
+            continue
+        slot = (buchung.get("tag"), buchung.get("zeitslot"))
+        rang = (buchung.get("erstellt_am") or "", key)
+        vorher = erste.get(slot)
+        if vorher is None:
+            erste[slot] = rang
+        elif rang < vorher:
+            doppelt.append(vorher[1])
+            erste[slot] = rang
+        else:
+            doppelt.append(key)
+    return doppelt
+
+def _check_double_booking(tisch_id: str, tisch: Dict[str, Any]) -> List[Violation]:
+    buchungen = _buchungen(tisch)
+    verstoesse = []
+    for key in _double_bookings(buchungen):
+        buchung = buchungen[key]
+        verstoesse.append(Violation(
+            "double_booking", tisch_id, key,
+            f"Desk {tisch_id}: {buchung.get('tag')} {buchung.get('zeitslot')} is booked more than once "
+            f"({key}, {buchung.get('person', '')})", True))
+    return verstoesse
+
+def _repair_double_booking(tisch: Dict[str, Any]):
+    for key in _double_bookings(_buchungen(tisch)):
+        del tisch["buchungen"][key]
+
+# Rule name -> (check, repair); repairs run in this order
+RULES: Dict[str, Tuple[Callable, Callable]] = {
+    "desk_type": (_check_desk_type, _repair_desk_type),
+    "computer_type": (_check_computer_type, _repair_computer_type),
+    "screen_count": (_check_screen_count, _repair_screen_count),
+    "booking_slot": (_check_booking_slot, _repair_booking_slot),
+    "booking_on_full_desk": (_check_booking_on_full_desk, _repair_booking_on_full_desk),
+    "double_booking": (_check_double_booking, _repair_double_booking),
+}
+
+def check_desk(tisch_id: str, tisch: Dict[str, Any]) -> List[Violation]:
+    """All violations of one desk"""
+    verstoesse = []
+    for check, _ in RULES.values():
+        verstoesse.extend(check(tisch_id, tisch))
+    return verstoesse
+
+def check_config(config: Dict[str, Any]) -> List[Violation]:
+    """All violations of a configuration"""
+    verstoesse = []
+    for tisch_id, tisch in config.get("tische", {}).items():
+        verstoesse.extend(check_desk(tisch_id, tisch))
+    return verstoesse
+
+def repair_desk(tisch_id: str, tisch: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return a repaired copy of the desk, or None if there is nothing to repair"""
+    neuer_tisch = None
+    for check, repair in RULES.values():
+        # Check the already repaired copy, earlier repairs can fix later violations
+        if any(v.reparierbar for v in check(tisch_id, neuer_tisch or tisch)):
+            if neuer_tisch is None:
+                neuer_tisch = dict(tisch)
+                if isinstance(tisch.get("rechner"), Mapping):
+                    neuer_tisch["rechner"] = dict(tisch["rechner"])
+                if isinstance(tisch.get("buchungen"), Mapping):
+                    neuer_tisch["buchungen"] = dict(tisch["buchungen"])
+            repair(neuer_tisch)
+    return neuer_tisch
+
+def repair_config(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Repaired copies of all desks with repairable violations (desk id -> desk)"""
+    repariert = {}
+    for tisch_id, tisch in config.get("tische", {}).items():
+        neuer_tisch = repair_desk(tisch_id, tisch)
+        if neuer_tisch is not None:
+            repariert[tisch_id] = neuer_tisch
+    return repariert
+
+class IntegrityMonitor:
+    """
+    Violations of one room, kept up to date by re-checking only the desks of each write
+    With auto_repair, repairable violations are fixed with a follow-up write.
+    """
+
+    def __init__(self, room_id: str, auto_repair: bool = INTEGRITY_AUTO_REPAIR):
+        self.room_id = room_id
+        self.auto_repair = auto_repair
+        self._lock = threading.Lock()
+        self._violations: Dict[str, List[Violation]] = {}
+
+    def start(self):
+        """Subscribe to the store and check all desks once"""
+        from modules.store import get_store
+        store = get_store(self.room_id)
+        store.subscribe(self._on_change)
+        _, config = store.snapshot()
+        self._recheck(config.get("tische", {}), set(config.get("tische", {})))
+
+    def violations(self) -> List[Violation]:
+        """Current violations, ordered by desk"""
+        with self._lock:
+            return [v for tisch_id in sorted(self._violations) for v in self._violations[tisch_id]]
+
+    def repair(self) -> int:
+        """Repair all repairable violations with a single write, returns the number of repaired desks"""
+        from modules.store import get_store
+        repariert = {}
+
+        def reparieren(tische: Dict[str, Dict]) -> Dict[str, Dict]:
+            # On the current desks under the store's write lock, so no write in between is lost
+            repariert.update(repair_config({"tische": tische}))
+            return repariert
+
+        get_store(self.room_id).modify_desks(reparieren)
+        return len(repariert)
+
+    def _on_change(self, version: int, changed: Set[str]):
+        from modules.store import get_store
+        store = get_store(self.room_id)
+        _, config = store.snapshot()
+        tische = config.get("tische", {})
+        ergebnisse = self._recheck(tische, changed)
+
+        if self.auto_repair and any(v.reparierbar for verstoesse in ergebnisse.values() for v in verstoesse):
+            def reparieren(aktuell: Dict[str, Dict]) -> Dict[str, Dict]:
+                repariert = {}
+                for tisch_id in changed:
+                    if tisch_id in aktuell:
+                        neuer_tisch = repair_desk(tisch_id, aktuell[tisch_id])
+                        if neuer_tisch is not None:
+                            repariert[tisch_id] = neuer_tisch
+                return repariert
+            # The repaired desks have no repairable violations left, so this does not repeat
+            store.modify_desks(reparieren)
+
+    def _recheck(self, tische: Dict[str, Any], changed: Set[str]) -> Dict[str, List[Violation]]:
+        ergebnisse = {tisch_id: check_desk(tisch_id, tische[tisch_id]) for tisch_id in changed if tisch_id in tische}
+        with self._lock:
+            for tisch_id in changed:
+                verstoesse = ergebnisse.get(tisch_id)
+                if verstoesse:
+                    self._violations[tisch_id] = verstoesse
+                else:
+                    self._violations.pop(tisch_id, None)
+        return ergebnisse
+
+_monitors: Dict[str, IntegrityMonitor] = {}
+_monitors_lock = threading.Lock()
+
+def get_monitor(room_id: str = DEFAULT_ROOM) -> IntegrityMonitor:
+    """Return the process-wide integrity monitor of a room (started on first use)"""
+    with _monitors_lock:
+        if room_id not in _monitors:
+            monitor = IntegrityMonitor(room_id)
+            monitor.start()
+            _monitors[room_id] = monitor
+        return _monitors[room_id]
+
+def main():
+    import argparse
+    from modules.rooms import load_rooms, room_file
+    from modules.utils import write_config
+
+    parser = argparse.ArgumentParser(description="Check desk configurations for rule violations")
+    gruppe = parser.add_mutually_exclusive_group()
+    gruppe.add_argument("--room", default=DEFAULT_ROOM)
+    gruppe.add_argument("--all", action="store_true", help="check all rooms")
+    gruppe.add_argument("--file", help="check a configuration file outside of the room registry")
+    parser.add_argument("--fix", action="store_true", help="repair repairable violations")
+    parser.add_argument("--json", action="store_true", help="print the violations as JSON")
+    args = parser.parse_args()
+
+    if args.file:
+        ziele = [(args.file, args.file)]
+    else:
+        room_ids = list(load_rooms()) if args.all else [args.room]
+        ziele = [(room_id, room_file(room_id)) for room_id in room_ids]
+
+    bericht = {}
+    for name, path in ziele:
+        # The file as it is on disk, without the migration applied by load_config
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        start = time.perf_counter()
+        verstoesse = check_config(config)
+        dauer_ms = (time.perf_counter() - start) * 1000
+
+        repariert = 0
+        if args.fix and any(v.reparierbar for v in verstoesse):
+            if args.file:
+                tische = repair_config(config)
+                write_config({**config, "tische": {**config["tische"], **tische}}, path)
+            else:
+                from modules.store import get_store
+                zu_reparieren = {v.tisch for v in verstoesse if v.reparierbar}
+                tische = {}
+
+                def reparieren(aktuell: Dict[str, Dict]) -> Dict[str, Dict]:
+                    # The current desks of the store, another process may have written since reading the file
+                    tische.update(repair_config({"tische": aktuell}))
+                    # Desks already fixed by the migration on load are written back as loaded
+                    for tisch_id in zu_reparieren - tische.keys():
+                        if tisch_id in aktuell:
+                            tische[tisch_id] = aktuell[tisch_id]
+                    return tische
+
+                get_store(name).modify_desks(reparieren)
+            repariert = len(tische)
+            verstoesse = [v for v in verstoesse if not v.reparierbar]
+
+        bericht[name] = {
+            "desks": len(config.get("tische", {})),
+            "bookings": sum(len(t.get("buchungen", {})) for t in config.get("tische", {}).values()),
+            "check_ms": round(dauer_ms, 2),
+            "repaired_desks": repariert,
+            "violations": [v.to_dict() for v in verstoesse]
+        }
+
+    if args.json:
+        print(json.dumps(bericht, indent=2, ensure_ascii=False))
+    else:
+        for name, ergebnis in bericht.items():
+            print(f"{name}: {ergebnis['desks']} desks, {ergebnis['bookings']} bookings checked in "
+                  f"{ergebnis['check_ms']} ms, {len(ergebnis['violations'])} violations"
+                  + (f", {ergebnis['repaired_desks']} desks repaired" if args.fix else ""))
+            for v in ergebnis["violations"]:
+                print(f"  [{v['regel']}] {v['meldung']}" + ("" if v["reparierbar"] else " (manual fix needed)"))
+    if any(ergebnis["violations"] for ergebnis in bericht.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Append-only JSON lines files shared between processes
+
+Used by the change feed and the waitlist. Writers hold an exclusive lock
+on "<file>.lock" while they read the latest lines and append theirs, so
+several processes (Streamlit server, headless workers, command line
+tools) can write the same file. Readers pick up lines appended by other
+processes incrementally and only re-read the whole file if it was
+replaced in the meantime (rewritten when it was truncated).
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        # Retries for 10 s before raising OSError
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class JsonLog:
+    """
+    One JSON value per line, appended under a lock shared by threads and processes
+    read() returns the lines added since the previous read(). Writers call read()
+    and then append() or rewrite() inside one locked() block.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._lock_handle = None
+        # Inode and end of the last complete line read so far
+        self._inode: Optional[int] = None
+        self._offset = 0
+
+    @contextmanager
+    def locked(self):
+        """Exclusive access across threads and processes (reentrant)"""
+        with self._lock:
+            if self._depth == 0:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                handle = open(f"{self.path}.lock", "a+b")
+                try:
+                    _lock_file(handle)
+                except BaseException:
+                    handle.close()
+                    raise
+                self._lock_handle = handle
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    handle, self._lock_handle = self._lock_handle, None
+                    try:
+                        _unlock_file(handle)
+                    finally:
+                        handle.close()
+
+    def read(self) -> Tuple[bool, List[Any]]:
+        """
+        Lines added since the last read as (replaced, values)
+        replaced is True if the file was replaced or removed since the last read;
+        values then hold the whole file. An incomplete last line is left for the next read.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                replaced = self._inode is not None
+                self._inode, self._offset = None, 0
+                return replaced, []
+            replaced = stat.st_ino != self._inode or stat.st_size < self._offset
+            start = 0 if replaced else self._offset
+            if stat.st_size == start:
+                self._inode, self._offset = stat.st_ino, start
+                return replaced, []
+
+            with open(self.path, "rb") as f:
+                f.seek(start)
+                daten = f.read()
+            werte, gelesen = [], 0
+            for zeile in daten.splitlines(keepends=True):
+                if not zeile.endswith(b"\n"):
+                    break
+                gelesen += len(zeile)
+                if not zeile.strip():
+                    continue
+                try:
+                    werte.append(json.loads(zeile))
+                except ValueError:
+                    # Line damaged by a crash, the lines after it are intact
+                    continue
+            self._inode, self._offset = stat.st_ino, start + gelesen
+            return replaced, werte
+
+    def append(self, werte: Iterable[Any]):
+        """Append values, the caller holds locked() and has read() the file"""
+        daten = "".join(json.dumps(wert, ensure_ascii=False) + "\n" for wert in werte).encode("utf-8")
+        with self._lock:
+            with open(self.path, "ab") as f:
+                if f.tell() > self._offset:
+                    # Drop an incomplete line left by a crashed writer
+                    f.truncate(self._offset)
+                    f.seek(self._offset)
+                f.write(daten)
+                f.flush()
+                self._inode = os.fstat(f.fileno()).st_ino
+                self._offset = f.tell()
+
+    def rewrite(self, werte: Iterable[Any]):
+        """Replace the whole file atomically, the caller holds locked()"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for wert in werte:
+                    f.write(json.dumps(wert, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            stat = os.stat(self.path)
+            self._inode, self._offset = stat.st_ino, stat.st_size
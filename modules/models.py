@@ -0,0 +1,588 @@
+"""
+Compact data model for desks and bookings
+
+This is what the store holds in memory. The JSON layout stores every
+booking as a dict with the weekday, time slot and computer mode spelled
+out under a long string key. Here a booking is one __slots__ object with
+enum-coded weekday and computer mode, the slot as index into TIMESLOTS
+and the id of its key as integer; the key is rebuilt when asked for. The
+bookings of a desk are a tuple sorted by day and slot, so the booking
+views need no sorting or grouping by strings.
+
+The store converts the file once when loading it (config_from_json) and
+write_config() converts back (config_to_json). The conversion is
+lossless: missing keys stay missing, unknown keys are kept in extra and
+bookings with a missing or unknown day or slot are kept as they are.
+German day and computer mode names are read like the English ones, as
+migrate_weekdays() does.
+
+Desk, Computer, Booking and BookingMap are read-only mappings with the
+keys of the JSON layout, so code reading desks like dicts (tisch.get(...),
+{**tisch, ...}) keeps working. Writers build new desk dicts from them,
+which the store converts again.
+"""
+import copy
+import re
+import sys
+from collections.abc import ItemsView, Mapping, ValuesView
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from modules.config import WEEKDAYS_ALL, TIMESLOTS, COMPUTER_MODES
+from modules.utils import WEEKDAY_MAPPING, COMPUTER_MODE_MAPPING
+
+# Index lookups for the string values used in the JSON layout
+TIMESLOT_INDEX = {slot: idx for idx, slot in enumerate(TIMESLOTS)}
+
+# Booking keys look like "Tuesday_09:00-10:00_20251028234111597313"
+BOOKING_KEY_PATTERN = re.compile(r"^([^_]+)_(\d{2}:\d{2}-\d{2}:\d{2})_(0|[1-9]\d*)$")
+
+# Keys with their own slot, all other keys are kept in extra
+BOOKING_FIELDS = frozenset(("person", "tag", "zeitslot", "rechner_modus", "notizen", "erstellt_am"))
+COMPUTER_FIELDS = frozenset(("vorhanden", "typ", "name", "abschaltbar", "bildschirme"))
+DESK_FIELDS = frozenset(("name", "typ", "rechner", "buchungen", "gebucht_von", "projekt_name"))
+
+_BOOKING_TEXT_FIELDS = frozenset(("person", "notizen", "erstellt_am"))
+
+# Default of the mapping lookups, tells a missing key from a null value
+_MISSING = object()
+
+class Weekday(IntEnum):
+    """Weekday, ordered like WEEKDAYS_ALL"""
+    MONDAY = 0
+    TUESDAY = 1
+    WEDNESDAY = 2
+    THURSDAY = 3
+    FRIDAY = 4
+    SATURDAY = 5
+    SUNDAY = 6
+
+    @classmethod
+    def from_name(cls, name: str) -> "Weekday":
+        """Parse an English or German weekday name"""
+        return WEEKDAY_BY_NAME[name]
+
+    @property
+    def label(self) -> str:
+        return WEEKDAYS_ALL[self]
+
+class RechnerModus(IntEnum):
+    """Computer usage mode of a booking, ordered like COMPUTER_MODES"""
+    SCREENS_ONLY = 0
+    COMPUTER_ACTIVE = 1
+    TRAINING_MODE = 2
+    NO_COMPUTER = 3
+
+    @classmethod
+    def from_name(cls, name: str) -> "RechnerModus":
+        """Parse an English or German computer mode"""
+        return RECHNER_MODUS_BY_NAME[name]
+
+    @property
+    def label(self) -> str:
+        return COMPUTER_MODES[self]
+
+# Enum lookups by English and German name (enum construction by value is slow)
+WEEKDAY_BY_NAME = {name: Weekday(idx) for idx, name in enumerate(WEEKDAYS_ALL)}
+WEEKDAY_BY_NAME.update({de: WEEKDAY_BY_NAME[en] for de, en in WEEKDAY_MAPPING.items()})
+RECHNER_MODUS_BY_NAME = {name: RechnerModus(idx) for idx, name in enumerate(COMPUTER_MODES)}
+RECHNER_MODUS_BY_NAME.update({de: RECHNER_MODUS_BY_NAME[en] for de, en in COMPUTER_MODE_MAPPING.items()})
+
+def _extra(data: Mapping, fields: frozenset) -> Optional[Dict[str, Any]]:
+    """
+    Keys of data without an own slot (None if there are none)
+    Own keys set to null are kept here too, since None in a slot means the key is missing.
+    """
+    if data.keys() <= fields and None not in data.values():
+        return None
+    return copy.deepcopy({k: v for k, v in data.items() if k not in fields or v is None}) or None
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+@dataclass(eq=False)
+class Booking(Mapping):
+    """A single schedule booking (one weekday, one time slot), a read-only mapping like its JSON dict"""
+    __slots__ = ("id", "tag", "slot", "person", "rechner_modus", "notizen", "erstellt_am",
+                 "key_tag", "raw_key", "extra")
+    id: int
+    tag: Weekday
+    slot: int
+    # None = key not present in JSON
+    person: Optional[str]
+    rechner_modus: Optional[RechnerModus]
+    notizen: Optional[str]
+    erstellt_am: Optional[str]
+    # Weekday spelling used in the key if it differs from tag (e.g. "Montag" in old keys)
+    key_tag: Optional[str]
+    # Original key if it does not follow the "<day>_<slot>_<id>" pattern
+    raw_key: Optional[str]
+    # Unknown keys (and an unknown computer mode) exactly as in JSON
+    extra: Optional[Dict[str, Any]]
+
+    @property
+    def zeitslot(self) -> str:
+        return TIMESLOTS[self.slot]
+
+    @property
+    def key(self) -> str:
+        """Key of the booking in the JSON layout"""
+        if self.raw_key is not None:
+            return self.raw_key
+        return f"{self.key_tag or WEEKDAYS_ALL[self.tag]}_{TIMESLOTS[self.slot]}_{self.id}"
+
+    @property
+    def sort_key(self) -> tuple:
+        return (self.tag, self.slot)
+
+    @classmethod
+    def from_dict(cls, key: str, data: Mapping) -> "Booking":
+        """
+        Create a booking from its JSON key and dict
+        Raises ValueError if the day or time slot is missing or unknown.
+        """
+        try:
+            tag = WEEKDAY_BY_NAME.get(data.get("tag"))
+            slot = TIMESLOT_INDEX.get(data.get("zeitslot"))
+        except (AttributeError, TypeError):
+            raise ValueError(f"Booking {key}: not a booking dict") from None
+        if tag is None or slot is None:
+            raise ValueError(f"Booking {key}: unknown day {data.get('tag')!r} or time slot {data.get('zeitslot')!r}")
+
+        extra = _extra(data, BOOKING_FIELDS)
+        modus = data.get("rechner_modus")
+        if modus is not None and (type(modus) is not str or modus not in RECHNER_MODUS_BY_NAME):
+            extra = {**(extra or {}), "rechner_modus": copy.deepcopy(modus)}
+            modus = None
+
+        booking_id, key_tag, raw_key = 0, None, key
+        match = BOOKING_KEY_PATTERN.match(key)
+        if match:
+            key_day, key_slot, key_id = match.groups()
+            if key_slot == data["zeitslot"] and key_day in WEEKDAY_BY_NAME:
+                booking_id, raw_key = int(key_id), None
+                if key_day != tag.label:
+                    key_tag = sys.intern(key_day)
+
+        return cls(
+            id=booking_id,
+            tag=tag,
+            slot=slot,
+            person=_intern(data.get("person")),
+            rechner_modus=RECHNER_MODUS_BY_NAME[modus] if modus is not None else None,
+            notizen=data.get("notizen"),
+            erstellt_am=data.get("erstellt_am"),
+            key_tag=key_tag,
+            raw_key=raw_key,
+            extra=extra
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert back to the JSON layout (without the key)"""
+        data = {}
+        if self.person is not None:
+            data["person"] = self.person
+        data["tag"] = self.tag.label
+        data["zeitslot"] = self.zeitslot
+        if self.rechner_modus is not None:
+            data["rechner_modus"] = self.rechner_modus.label
+        if self.notizen is not None:
+            data["notizen"] = self.notizen
+        if self.erstellt_am is not None:
+            data["erstellt_am"] = self.erstellt_am
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name == "tag":
+            return WEEKDAYS_ALL[self.tag]
+        if name == "zeitslot":
+            return TIMESLOTS[self.slot]
+        if name == "rechner_modus":
+            if self.rechner_modus is not None:
+                return self.rechner_modus.label
+        elif name in _BOOKING_TEXT_FIELDS:
+            wert = getattr(self, name)
+            if wert is not None:
+                return wert
+        return self.extra.get(name, default) if self.extra is not None else default
+
+    def __getitem__(self, name: str) -> Any:
+        wert = self.get(name, _MISSING)
+        if wert is _MISSING:
+            raise KeyError(name)
+        return wert
+
+    def __contains__(self, name: Any) -> bool:
+        return self.get(name, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def values(self):
+        return self.to_dict().values()
+
+    def __eq__(self, other: Any) -> bool:
+        # Like the JSON dicts: the data is compared, not the key
+        if type(other) is Booking:
+            return (self.tag, self.slot, self.person, self.rechner_modus, self.notizen, self.erstellt_am,
+                    self.extra) == (other.tag, other.slot, other.person, other.rechner_modus, other.notizen,
+                                    other.erstellt_am, other.extra)
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+def _booking_order(booking: Booking) -> tuple:
+    # Unique per key, so equal booking maps hold their bookings in the same order
+    return (booking.tag, booking.slot, booking.id, booking.key_tag or "", booking.raw_key or "")
+
+class _BookingItems(ItemsView):
+    __slots__ = ()
+
+    def __iter__(self):
+        buchungen = self._mapping
+        for booking in buchungen.bookings:
+            yield booking.key, booking
+        if buchungen.invalid:
+            yield from buchungen.invalid.items()
+
+class _BookingValues(ValuesView):
+    __slots__ = ()
+
+    def __iter__(self):
+        buchungen = self._mapping
+        yield from buchungen.bookings
+        if buchungen.invalid:
+            yield from buchungen.invalid.values()
+
+class BookingMap(Mapping):
+    """
+    Bookings of a desk by key, a read-only mapping like the "buchungen" dict of the JSON layout
+    bookings holds the Booking objects sorted by weekday, slot and id. Bookings
+    Booking.from_dict() cannot parse are kept in invalid (key -> data exactly as in JSON).
+    """
+    __slots__ = ("bookings", "invalid")
+
+    def __init__(self, bookings: Tuple[Booking, ...] = (), invalid: Optional[Dict[str, Any]] = None):
+        self.bookings = bookings
+        self.invalid = invalid or None
+
+    @classmethod
+    def from_dict(cls, buchungen: Mapping) -> "BookingMap":
+        """Convert booking dicts, Booking objects under their own key are kept"""
+        if type(buchungen) is BookingMap:
+            return buchungen
+        gueltig, ungueltig = [], {}
+        for key, daten in buchungen.items():
+            if type(daten) is Booking and daten.key == key:
+                gueltig.append(daten)
+                continue
+            try:
+                gueltig.append(Booking.from_dict(key, daten))
+            except ValueError:
+                ungueltig[key] = copy.deepcopy(daten)
+        gueltig.sort(key=_booking_order)
+        return cls(tuple(gueltig), ungueltig)
+
+    def to_dict(self) -> Dict[str, Any]:
+        buchungen = {booking.key: booking.to_dict() for booking in self.bookings}
+        if self.invalid:
+            buchungen.update(copy.deepcopy(self.invalid))
+        return buchungen
+
+    def _find(self, key: str) -> Optional[Booking]:
+        bookings = self.bookings
+        match = BOOKING_KEY_PATTERN.match(key) if type(key) is str else None
+        tag = WEEKDAY_BY_NAME.get(match.group(1)) if match else None
+        slot = TIMESLOT_INDEX.get(match.group(2)) if match else None
+        if tag is not None and slot is not None:
+            # Binary search for (day, slot, id), then compare the keys of the equal ones
+            ziel = (tag, slot, int(match.group(3)))
+            links, rechts = 0, len(bookings)
+            while links < rechts:
+                mitte = (links + rechts) // 2
+                booking = bookings[mitte]
+                if (booking.tag, booking.slot, booking.id) < ziel:
+                    links = mitte + 1
+                else:
+                    rechts = mitte
+            while links < len(bookings) and (bookings[links].tag, bookings[links].slot, bookings[links].id) == ziel:
+                if bookings[links].key == key:
+                    return bookings[links]
+                links += 1
+        # Keys not following the pattern, or whose slot differs from the booking's
+        for booking in bookings:
+            if booking.raw_key == key:
+                return booking
+        return None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if self.invalid is not None and key in self.invalid:
+            return self.invalid[key]
+        booking = self._find(key)
+        return booking if booking is not None else default
+
+    def __getitem__(self, key: str) -> Any:
+        wert = self.get(key, _MISSING)
+        if wert is _MISSING:
+            raise KeyError(key)
+        return wert
+
+    def __contains__(self, key: Any) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        for booking in self.bookings:
+            yield booking.key
+        if self.invalid:
+            yield from self.invalid
+
+    def __len__(self) -> int:
+        return len(self.bookings) + (len(self.invalid) if self.invalid else 0)
+
+    def items(self):
+        return _BookingItems(self)
+
+    def values(self):
+        return _BookingValues(self)
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is BookingMap:
+            return (len(self.bookings) == len(other.bookings) and self.invalid == other.invalid
+                    and all(a is b or (a == b and a.key == b.key) for a, b in zip(self.bookings, other.bookings)))
+        if isinstance(other, Mapping):
+            return len(self) == len(other) and dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"BookingMap({dict(self.items())!r})"
+
+@dataclass(eq=False)
+class Computer(Mapping):
+    """Computer and screen setup of a desk (None = key not present in JSON), a read-only mapping"""
+    __slots__ = ("vorhanden", "typ", "name", "abschaltbar", "bildschirme", "extra")
+    vorhanden: Optional[bool]
+    typ: Optional[str]
+    name: Optional[str]
+    abschaltbar: Optional[bool]
+    bildschirme: Optional[int]
+    extra: Optional[Dict[str, Any]]
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Computer":
+        if type(data) is Computer:
+            return data
+        return cls(
+            vorhanden=data.get("vorhanden"),
+            typ=_intern(data.get("typ")),
+            name=data.get("name"),
+            abschaltbar=data.get("abschaltbar"),
+            bildschirme=copy.deepcopy(data.get("bildschirme")),
+            extra=_extra(data, COMPUTER_FIELDS)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {field: getattr(self, field) for field in self.__slots__[:-1] if getattr(self, field) is not None}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name in COMPUTER_FIELDS:
+            wert = getattr(self, name)
+            if wert is not None:
+                return wert
+        return self.extra.get(name, default) if self.extra is not None else default
+
+    def __getitem__(self, name: str) -> Any:
+        wert = self.get(name, _MISSING)
+        if wert is _MISSING:
+            raise KeyError(name)
+        return wert
+
+    def __contains__(self, name: Any) -> bool:
+        return self.get(name, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def values(self):
+        return self.to_dict().values()
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is Computer:
+            return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+@dataclass(eq=False)
+class Desk(Mapping):
+    """
+    A desk with its computer and bookings (None = key not present in JSON), a read-only mapping
+    Mapping access returns rechner and buchungen as Computer and BookingMap.
+    """
+    __slots__ = ("id", "name", "typ", "rechner", "buchungen", "gebucht_von", "projekt_name", "extra")
+    id: str
+    name: Optional[str]
+    typ: Optional[str]
+    # Computer, or the value as in JSON if it is no object
+    rechner: Any
+    # BookingMap, or the value as in JSON if it is no object
+    buchungen: Any
+    gebucht_von: Optional[str]
+    projekt_name: Optional[str]
+    extra: Optional[Dict[str, Any]]
+
+    @classmethod
+    def from_dict(cls, desk_id: str, data: Mapping) -> "Desk":
+        rechner = data.get("rechner")
+        buchungen = data.get("buchungen")
+        return cls(
+            id=desk_id,
+            name=copy.deepcopy(data.get("name")),
+            typ=_intern(data.get("typ")),
+            rechner=Computer.from_dict(rechner) if isinstance(rechner, Mapping) else copy.deepcopy(rechner),
+            buchungen=BookingMap.from_dict(buchungen) if isinstance(buchungen, Mapping) else copy.deepcopy(buchungen),
+            gebucht_von=copy.deepcopy(data.get("gebucht_von")),
+            projekt_name=copy.deepcopy(data.get("projekt_name")),
+            extra=_extra(data, DESK_FIELDS)
+        )
+
+    def _fields(self) -> Dict[str, Any]:
+        # Shallow: rechner and buchungen stay Computer and BookingMap
+        data = {field: getattr(self, field) for field in self.__slots__[1:-1] if getattr(self, field) is not None}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: as_json(wert) for field, wert in self._fields().items()}
+
+    @property
+    def invalid_buchungen(self) -> Optional[Dict[str, Any]]:
+        """Bookings Booking.from_dict() cannot parse, key -> data exactly as in JSON"""
+        return self.buchungen.invalid if isinstance(self.buchungen, BookingMap) else None
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name in DESK_FIELDS:
+            wert = getattr(self, name)
+            if wert is not None:
+                return wert
+        return self.extra.get(name, default) if self.extra is not None else default
+
+    def __getitem__(self, name: str) -> Any:
+        wert = self.get(name, _MISSING)
+        if wert is _MISSING:
+            raise KeyError(name)
+        return wert
+
+    def __contains__(self, name: Any) -> bool:
+        return self.get(name, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields())
+
+    def __len__(self) -> int:
+        return len(self._fields())
+
+    def keys(self):
+        return self._fields().keys()
+
+    def items(self):
+        return self._fields().items()
+
+    def values(self):
+        return self._fields().values()
+
+    def __eq__(self, other: Any) -> bool:
+        # Like the JSON dicts: the data is compared, not the desk id
+        if type(other) is Desk:
+            return all(getattr(self, field) == getattr(other, field) for field in self.__slots__[1:])
+        if isinstance(other, Mapping):
+            return self._fields() == dict(other)
+        return NotImplemented
+
+_MODELS = (Desk, Computer, Booking, BookingMap)
+
+def as_json(value: Any) -> Any:
+    """JSON layout of a Desk, Computer, Booking or BookingMap, other values are returned unchanged"""
+    return value.to_dict() if isinstance(value, _MODELS) else value
+
+def desk_from_json(desk_id: str, data: Any) -> Any:
+    """
+    Desk object of a desk dict as held by the store
+    Desk objects are kept (they are never modified), values that are no object are copied as they are.
+    """
+    if type(data) is Desk and data.id == desk_id:
+        return data
+    if isinstance(data, Mapping):
+        return Desk.from_dict(desk_id, data)
+    return copy.deepcopy(data)
+
+def config_from_json(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Configuration as held by the store: the desks as Desk objects, everything else copied"""
+    neu = {}
+    for key, wert in config.items():
+        if key == "tische" and isinstance(wert, Mapping):
+            neu[key] = {desk_id: desk_from_json(desk_id, tisch) for desk_id, tisch in wert.items()}
+        else:
+            neu[key] = copy.deepcopy(wert)
+    return neu
+
+def config_to_json(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Configuration in the JSON layout (desks that are plain dicts are kept as they are)"""
+    neu = dict(config)
+    if isinstance(neu.get("tische"), Mapping):
+        neu["tische"] = {desk_id: as_json(tisch) for desk_id, tisch in neu["tische"].items()}
+    return neu
+
+def desks_from_config(config: Dict[str, Any]) -> Dict[str, Desk]:
+    """Convert the "tische" section of a configuration into Desk objects"""
+    return {desk_id: Desk.from_dict(desk_id, data) for desk_id, data in config.get("tische", {}).items()}
+
+def desks_to_config(desks: Dict[str, Desk]) -> Dict[str, Any]:
+    """Convert Desk objects back into the JSON layout"""
+    return {"tische": {desk_id: desk.to_dict() for desk_id, desk in desks.items()}}
+
+def bookings_of(buchungen: Mapping) -> Tuple[Booking, ...]:
+    """
+    Bookings of a desk as Booking objects sorted by weekday and slot
+    Free for the store's BookingMap, plain booking dicts are converted on every call.
+    Bookings with a missing or unknown day or time slot are skipped (see invalid_bookings()).
+    """
+    if not buchungen:
+        return ()
+    return BookingMap.from_dict(buchungen).bookings
+
+def invalid_bookings(buchungen: Mapping) -> List[Tuple[str, Any]]:
+    """(key, data) of the bookings of a desk that bookings_of() skips"""
+    if not buchungen:
+        return []
+    return list((BookingMap.from_dict(buchungen).invalid or {}).items())
+
+def weekly_occupancy(buchungen: Mapping) -> Dict[tuple, List[str]]:
+    """Persons booked per (weekday, slot index) of a desk"""
+    belegung = {}
+    for buchung in bookings_of(buchungen):
+        belegung.setdefault((buchung.tag, buchung.slot), []).append(buchung.person or "Unknown")
+    return belegung
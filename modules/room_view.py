@@ -2,13 +2,52 @@
 Room View Mode (🗺️ Room View Tab)
 """
 import streamlit as st
-from typing import Dict, Any
+from typing import Dict, Any, List
+from modules import instrumentation
+from modules.config import WEEKDAYS, TIMESLOTS_BOOKING, COMPUTER_TYPES, SCREEN_COUNTS, DEFAULT_ROOM
+from modules.desk_templates import desk_sort_key
+from modules.rooms import load_rooms, find_free_desks
 from modules.utils import get_desk_status
 
+# Desk layout of the G120 room (rows of desk ids, see G120_Raumplan_WS25.png)
+G120_LAYOUT = [["0", "1", "2", "3", "4"], ["5", "6", "7", "8", "9"]]
+G120_CENTER = "10"
+
+def show_desk_card(tisch_id: str, tisch_data: Dict):
+    """Show status, computer and booking button of one desk"""
+    status, info = get_desk_status(tisch_data)
+    
+    st.markdown(f"### {status}")
+    st.info(f"**Desk {tisch_id}**\n\n{info}")
+    
+    rechner = tisch_data.get("rechner", {})
+    if rechner.get("vorhanden"):
+        rechner_typ = rechner.get("typ", "N/A")
+        st.caption(f"💻 {rechner_typ}")
+    
+    # Button to switch to desk planning
+    if st.button(f"📋 Book Desk {tisch_id}", key=f"goto_tisch_{tisch_id}", use_container_width=True):
+        st.session_state.selected_modus = "📋 Desk Planning"
+        st.session_state.selected_tisch_from_room = tisch_id
+        st.rerun()
+
+def show_desk_grid(tisch_ids: List[str], tische: Dict):
+    """Show desks in rows of five"""
+    for start in range(0, len(tisch_ids), 5):
+        cols = st.columns(5)
+        for idx, tisch_id in enumerate(tisch_ids[start:start + 5]):
+            with cols[idx]:
+                show_desk_card(tisch_id, tische[tisch_id])
+        st.markdown("<br>", unsafe_allow_html=True)
+
+@instrumentation.timed()
 def show_raumansicht_modus(config: Dict, tische: Dict):
     """Show the room view with all desks"""
+    room_id = st.session_state.selected_room
+    room = load_rooms().get(room_id, {"name": room_id})
+    
     st.header("🗺️ Room View")
-    st.markdown("### G120 Room - Overview of All Desks")
+    st.markdown(f"### {room['name']} Room - Overview of All Desks")
     
     # CSS for room view
     st.markdown("""
@@ -47,77 +86,61 @@ def show_raumansicht_modus(config: Dict, tische: Dict):
     
     st.info("ℹ️ Green = Free | Orange = Partially booked | Red = Fully booked | Blue = Project")
     
-    # Demo layout: 2 rows with 5 desks each
     st.markdown("---")
     
-    # First row (Desk 0-4)
-    cols1 = st.columns(5)
-    for idx, tisch_id in enumerate(["0", "1", "2", "3", "4"]):
-        if tisch_id in tische:
-            tisch_data = tische[tisch_id]
-            status, info = get_desk_status(tisch_data)
-            
-            with cols1[idx]:
-                st.markdown(f"### {status}")
-                st.info(f"**Desk {tisch_id}**\n\n{info}")
-                
-                rechner = tisch_data.get("rechner", {})
-                if rechner.get("vorhanden"):
-                    rechner_typ = rechner.get("typ", "N/A")
-                    st.caption(f"💻 {rechner_typ}")
-                
-                # Button to switch to desk planning
-                if st.button(f"📋 Book Desk {tisch_id}", key=f"goto_tisch_{tisch_id}", use_container_width=True):
-                    st.session_state.selected_modus = "📋 Desk Planning"
-                    st.session_state.selected_tisch_from_room = tisch_id
-                    st.rerun()
-    
-    st.markdown("<br>", unsafe_allow_html=True)
+    if room_id == DEFAULT_ROOM:
+        show_g120_layout(tische)
+        # Desks added beyond the fixed layout
+        im_layout = {t for reihe in G120_LAYOUT for t in reihe} | {G120_CENTER}
+        show_desk_grid(sorted((t for t in tische if t not in im_layout), key=desk_sort_key), tische)
+    elif tische:
+        show_desk_grid(sorted(tische, key=desk_sort_key), tische)
+    else:
+        st.info("ℹ️ This room has no desks yet. Create desks in 🔧 Desk Configuration → 🧩 Templates.")
     
-    # Second row (Desk 5-9)
-    cols2 = st.columns(5)
-    for idx, tisch_id in enumerate(["5", "6", "7", "8", "9"]):
-        if tisch_id in tische:
-            tisch_data = tische[tisch_id]
-            status, info = get_desk_status(tisch_data)
-            
-            with cols2[idx]:
-                st.markdown(f"### {status}")
-                st.info(f"**Desk {tisch_id}**\n\n{info}")
-                
-                rechner = tisch_data.get("rechner", {})
-                if rechner.get("vorhanden"):
-                    rechner_typ = rechner.get("typ", "N/A")
-                    st.caption(f"💻 {rechner_typ}")
-                
-                # Button to switch to desk planning
-                if st.button(f"📋 Book Desk {tisch_id}", key=f"goto_tisch_{tisch_id}", use_container_width=True):
-                    st.session_state.selected_modus = "📋 Desk Planning"
-                    st.session_state.selected_tisch_from_room = tisch_id
-                    st.rerun()
+    st.markdown("---")
+    st.caption("💡 Tip: Click 'Book Desk X' to create bookings directly")
     
-    st.markdown("<br>", unsafe_allow_html=True)
+    show_free_desk_search()
+
+def show_g120_layout(tische: Dict):
+    """Show the desks of the G120 room in their physical layout"""
+    # Two rows with 5 desks each
+    for reihe in G120_LAYOUT:
+        cols = st.columns(5)
+        for idx, tisch_id in enumerate(reihe):
+            if tisch_id in tische:
+                with cols[idx]:
+                    show_desk_card(tisch_id, tische[tisch_id])
+        
+        st.markdown("<br>", unsafe_allow_html=True)
     
     # Desk 10 centered
     col_left, col_center, col_right = st.columns([2, 1, 2])
     with col_center:
-        if "10" in tische:
-            tisch_data = tische["10"]
-            status, info = get_desk_status(tisch_data)
-            
-            st.markdown(f"### {status}")
-            st.info(f"**Desk 10**\n\n{info}")
-            
-            rechner = tisch_data.get("rechner", {})
-            if rechner.get("vorhanden"):
-                rechner_typ = rechner.get("typ", "N/A")
-                st.caption(f"💻 {rechner_typ}")
-            
-            # Button to switch to desk planning
-            if st.button(f"📋 Book Desk 10", key=f"goto_tisch_10", use_container_width=True):
-                st.session_state.selected_modus = "📋 Desk Planning"
-                st.session_state.selected_tisch_from_room = "10"
-                st.rerun()
-    
-    st.markdown("---")
-    st.caption("💡 Tip: Click 'Book Desk X' to create bookings directly")
+        if G120_CENTER in tische:
+            show_desk_card(G120_CENTER, tische[G120_CENTER])
+
+def show_free_desk_search():
+    """Search free schedule desks in all rooms for one time slot"""
+    with st.expander("🔎 Find a free desk in all rooms"):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            tag = st.selectbox("Day:", WEEKDAYS, key="search_tag")
+        with col2:
+            zeitslot = st.selectbox("Time Slot:", TIMESLOTS_BOOKING, key="search_slot")
+        with col3:
+            rechner_typ = st.selectbox("Computer:", ["Any"] + [t for t in COMPUTER_TYPES if t != "None"], key="search_rechner")
+        with col4:
+            min_bildschirme = st.selectbox("Min. Screens:", SCREEN_COUNTS, key="search_screens")
+        
+        if st.button("🔎 Search", key="search_free_desks"):
+            frei = find_free_desks(tag, zeitslot, rechner_typ=None if rechner_typ == "Any" else rechner_typ,
+                                   min_bildschirme=min_bildschirme)
+            if not frei:
+                st.warning("No free desk found")
+            else:
+                rooms = load_rooms()
+                st.success(f"✅ {len(frei)} free desk(s) on {tag} at {zeitslot}")
+                for eintrag in sorted(frei, key=lambda e: (e["room"], desk_sort_key(e["desk"]))):
+                    st.write(f"🏢 **{rooms.get(eintrag['room'], {}).get('name', eintrag['room'])}** – {eintrag['name']}")
@@ -0,0 +1,134 @@
+"""
+Rooms and buildings for G120 Desk Planning System
+
+Every room is a partition with its own shard file, so loading, caching and
+saving only touch the active room. The registry data/rooms.json maps room
+ids to building, display name and shard file. Without a registry there is a
+single room, DEFAULT_ROOM, stored in DATA_FILE.
+"""
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from modules.config import DATA_FILE, ROOMS_FILE, ROOMS_DIR, DEFAULT_ROOM
+
+# Room ids are used as file names
+ROOM_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Maximum number of threads used by cross-room queries
+MAX_WORKERS = 16
+
+_rooms_lock = threading.Lock()
+_rooms_cache: Optional[tuple] = None
+
+def default_rooms() -> Dict[str, Dict[str, Any]]:
+    """Registry used when no rooms file exists"""
+    return {DEFAULT_ROOM: {"name": DEFAULT_ROOM, "building": "", "file": DATA_FILE}}
+
+def load_rooms() -> Dict[str, Dict[str, Any]]:
+    """Room id -> {"name", "building", "file"} (cached until the registry file changes)"""
+    global _rooms_cache
+    try:
+        mtime = os.stat(ROOMS_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+
+    with _rooms_lock:
+        if _rooms_cache is not None and _rooms_cache[0] == mtime:
+            return _rooms_cache[1]
+
+        if mtime is None:
+            rooms = default_rooms()
+        else:
+            with open(ROOMS_FILE, 'r', encoding='utf-8') as f:
+                rooms = json.load(f).get("rooms", {})
+            for room_id, room in rooms.items():
+                room.setdefault("name", room_id)
+                room.setdefault("building", "")
+                room.setdefault("file", _shard_path(room_id))
+        _rooms_cache = (mtime, rooms)
+        return rooms
+
+def _shard_path(room_id: str) -> str:
+    if room_id == DEFAULT_ROOM:
+        return DATA_FILE
+    return os.path.join(ROOMS_DIR, f"{room_id}.json")
+
+def room_file(room_id: str) -> str:
+    """Shard file of a room"""
+    rooms = load_rooms()
+    if room_id in rooms:
+        return rooms[room_id]["file"]
+    return _shard_path(room_id)
+
+def add_room(room_id: str, name: str = "", building: str = "") -> Dict[str, Any]:
+    """Register a new room with an empty shard"""
+    if not ROOM_ID_PATTERN.match(room_id):
+        raise ValueError(f"Invalid room id: {room_id} (letters, digits, '-' and '_' only)")
+    rooms = dict(load_rooms())
+    if room_id in rooms:
+        raise ValueError(f"Room {room_id} already exists")
+
+    room = {"name": name or room_id, "building": building, "file": room_file(room_id)}
+    rooms[room_id] = room
+
+    os.makedirs(os.path.dirname(room["file"]), exist_ok=True)
+    if not os.path.exists(room["file"]):
+        with open(room["file"], 'w', encoding='utf-8') as f:
+            json.dump({"tische": {}}, f, indent=2, ensure_ascii=False)
+
+    os.makedirs(os.path.dirname(ROOMS_FILE), exist_ok=True)
+    tmp_path = f"{ROOMS_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"rooms": rooms}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, ROOMS_FILE)
+    return room
+
+def rooms_by_building() -> Dict[str, List[str]]:
+    """Building -> room ids"""
+    gebaeude = {}
+    for room_id, room in load_rooms().items():
+        gebaeude.setdefault(room["building"], []).append(room_id)
+    return gebaeude
+
+def desk_matches(tisch: Dict[str, Any], rechner_typ: Optional[str] = None, min_bildschirme: int = 0) -> bool:
+    """Check whether a desk fulfils the computer type and screen requirements"""
+    rechner = tisch.get("rechner", {})
+    if rechner_typ and (not rechner.get("vorhanden") or rechner.get("typ") != rechner_typ):
+        return False
+    return rechner.get("bildschirme", 0) >= min_bildschirme
+
+def free_desks_in_room(room_id: str, tag: str, zeitslot: str, rechner_typ: Optional[str] = None,
+                       min_bildschirme: int = 0) -> List[Dict[str, Any]]:
+    """Schedule desks of one room that are free at the given day and time slot"""
+    from modules.store import get_store
+    _, config = get_store(room_id).snapshot()
+    frei = []
+    for tisch_id, tisch in config.get("tische", {}).items():
+        if tisch.get("typ", "schedule") != "schedule" or not desk_matches(tisch, rechner_typ, min_bildschirme):
+            continue
+        belegt = any(
+            b.get("tag") == tag and b.get("zeitslot") == zeitslot
+            for b in tisch.get("buchungen", {}).values()
+        )
+        if not belegt:
+            frei.append({"room": room_id, "desk": tisch_id, "name": tisch.get("name", f"Desk {tisch_id}")})
+    return frei
+
+def find_free_desks(tag: str, zeitslot: str, room_ids: Optional[List[str]] = None,
+                    rechner_typ: Optional[str] = None, min_bildschirme: int = 0) -> List[Dict[str, Any]]:
+    """
+    Free schedule desks in several rooms (default: all rooms)
+    The rooms are queried in parallel; each room loads only its own shard.
+    """
+    room_ids = list(room_ids) if room_ids is not None else list(load_rooms())
+    if not room_ids:
+        return []
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(room_ids))) as pool:
+        ergebnisse = pool.map(
+            lambda room_id: free_desks_in_room(room_id, tag, zeitslot, rechner_typ, min_bildschirme),
+            room_ids
+        )
+        return [desk for frei in ergebnisse for desk in frei]
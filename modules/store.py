@@ -0,0 +1,333 @@
+"""
+Shared in-memory configuration store for G120 Desk Planning System
+
+One store per process holds the parsed configuration. All Streamlit
+sessions read the same snapshot instead of parsing their own copy.
+Snapshots are never mutated in place: every write builds a new top-level
+dict that shares all untouched desks with the previous snapshot
+(copy-on-write), so readers can keep using the snapshot they got.
+Desks are held as the compact objects of models.py: the file is converted
+once when it is loaded and the desk dicts of every write are converted
+when they are committed.
+
+Every write and every reload of a changed file is also recorded in the
+room's change feed (see changefeed.py) for external consumers.
+"""
+import copy
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Iterable, List, Optional, Set, Tuple
+from modules.changefeed import ChangeFeed, diff_snapshots, feed_path
+from modules.config import DATA_FILE, DEFAULT_ROOM
+from modules.models import config_from_json, desk_from_json
+from modules.rooms import room_file
+from modules.utils import file_signature, load_config, write_config
+
+# Number of versions for which the changed desk ids are remembered
+HISTORY_SIZE = 256
+
+class ReadWriteLock:
+    """Lock allowing many concurrent readers or a single writer"""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            # Waiting writers take precedence so they cannot starve
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+class ConfigStore:
+    """
+    Process-wide configuration store of one room
+    Readers call snapshot(), writers call update_desks() or replace().
+    Writers that build new desks from the current data use modify_desks(),
+    so no change made in between by another session is lost.
+    Listeners registered with subscribe() are called as
+    callback(version, changed_desk_ids) after every committed change.
+    """
+
+    def __init__(self, path: str = DATA_FILE, history_size: int = HISTORY_SIZE, room_id: str = DEFAULT_ROOM):
+        self.path = path
+        self.room_id = room_id
+        self._lock = ReadWriteLock()
+        self._config: Optional[Dict[str, Any]] = None
+        self._version = 0
+        self._signatur: Optional[Tuple[int, int, int]] = None
+        self._history = deque(maxlen=history_size)
+        self._listeners: List[Callable[[int, Set[str]], None]] = []
+        self.feed = ChangeFeed(feed_path(path))
+
+    @property
+    def version(self) -> int:
+        """Version of the current snapshot (increases with every change)"""
+        return self._version
+
+    def snapshot(self) -> Tuple[int, Dict[str, Any]]:
+        """
+        Return (version, config) of the current state
+        The returned config is shared between sessions and must be treated read-only;
+        its desks are Desk objects, read-only mappings with the keys of the JSON layout.
+        """
+        self._reload_if_stale()
+        with self._lock.read_locked():
+            return self._version, self._config
+
+    def changes_since(self, version: int) -> Optional[Set[str]]:
+        """
+        Desk ids changed after the given version
+        Returns None if the version is too old to be answered from the history.
+        """
+        with self._lock.read_locked():
+            if version >= self._version:
+                return set()
+            if not self._history or self._history[0][0] > version + 1:
+                return None
+            changed = set()
+            for entry_version, desk_ids in self._history:
+                if entry_version > version:
+                    changed.update(desk_ids)
+            return changed
+
+    def feed_since(self, revision: Optional[int], feed_id: Optional[str] = None
+                   ) -> Tuple[str, int, Optional[Dict[str, Any]], Optional[List[Dict[str, Any]]]]:
+        """
+        Return (feed id, revision, config, change feed entries after the given revision)
+        If the feed has the entries and records the current shard, they are read from the feed
+        file alone (no store lock, no parsing of the shard) and config is None. Otherwise
+        (revision None, another feed_id, entries no longer available) the entries are None
+        and config is the configuration of the returned revision.
+        """
+        if revision is not None:
+            # Stat first: a write in between shows up as a newer signature in the feed
+            signatur = file_signature(self.path)
+            aktuell_id, aktuell, feed_signatur, eintraege = self.feed.read_since(revision)
+            if eintraege is not None and feed_id in (None, aktuell_id) and feed_signatur == signatur:
+                return aktuell_id, aktuell, None, eintraege
+
+        # Exclusive, so the config matches the feed revision even if another process just wrote;
+        # also records an edit by hand before answering
+        with self._writing() as geladen:
+            aktuell_id, aktuell, _, eintraege = self.feed.read_since(revision)
+            if feed_id not in (None, aktuell_id):
+                eintraege = None
+            antwort = aktuell_id, aktuell, None if eintraege is not None else self._config, eintraege
+        if geladen:
+            self._notify(self._version, geladen)
+        return antwort
+
+    def update_desks(self, desks: Dict[str, Dict], removed: Iterable[str] = (),
+                     extra: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Commit new data for some desks in a single write
+        desks: desk id -> complete new desk data
+        removed: desk ids to delete
+        extra: top-level keys (other than "tische") to set
+        Returns the new version.
+        """
+        with self._writing() as geladen:
+            tische = dict(self._config.get("tische", {}))
+            changed = set()
+            for desk_id, desk_data in desks.items():
+                tische[desk_id] = desk_from_json(desk_id, desk_data)
+                changed.add(desk_id)
+            for desk_id in removed:
+                if tische.pop(desk_id, None) is not None:
+                    changed.add(desk_id)
+            new_config = dict(self._config)
+            new_config["tische"] = tische
+            if extra:
+                new_config.update(copy.deepcopy(extra))
+            version = self._commit(new_config, changed)
+        self._notify(version, changed | geladen)
+        return version
+
+    def modify_desks(self, fn: Callable[[Dict[str, Dict]], Optional[Dict[str, Dict]]]) -> Optional[int]:
+        """
+        Atomic read-modify-write of desks
+        fn(current desks) runs under the write lock and returns desk id -> complete new desk data,
+        or None/{} to write nothing. fn must not modify its argument or call the store.
+        Returns the new version, or None if nothing was written.
+        """
+        with self._writing() as geladen:
+            desks = fn(self._config.get("tische", {}))
+            if not desks:
+                version = None
+            else:
+                tische = dict(self._config.get("tische", {}))
+                for desk_id, desk_data in desks.items():
+                    tische[desk_id] = desk_from_json(desk_id, desk_data)
+                new_config = dict(self._config)
+                new_config["tische"] = tische
+                geladen |= set(desks)
+                version = self._commit(new_config, set(desks))
+        if geladen:
+            self._notify(self._version if version is None else version, geladen)
+        return version
+
+    def modify_desk(self, desk_id: str, fn: Callable[[Optional[Dict]], Optional[Dict]]) -> Optional[int]:
+        """
+        Atomic read-modify-write of one desk
+        fn(current desk data or None) returns the complete new desk data, or None to write nothing.
+        """
+        def modify(tische: Dict[str, Dict]) -> Optional[Dict[str, Dict]]:
+            neu = fn(tische.get(desk_id))
+            return {desk_id: neu} if neu is not None else None
+        return self.modify_desks(modify)
+
+    def replace(self, config: Dict[str, Any]) -> int:
+        """Replace the whole configuration, only desks that differ count as changed"""
+        new_config = config_from_json(config)
+        with self._writing() as geladen:
+            old_tische = self._config.get("tische", {})
+            new_tische = new_config.get("tische", {})
+            changed = {
+                desk_id for desk_id in set(old_tische) | set(new_tische)
+                if old_tische.get(desk_id) != new_tische.get(desk_id)
+            }
+            version = self._commit(new_config, changed)
+        self._notify(version, changed | geladen)
+        return version
+
+    def reload(self):
+        """Re-read the configuration file, all desks count as changed"""
+        with self._lock.write_locked():
+            version, changed = self._load()
+        self._notify(version, changed)
+
+    def subscribe(self, callback: Callable[[int, Set[str]], None]):
+        """Register a change listener"""
+        with self._lock.write_locked():
+            self._listeners.append(callback)
+        return callback
+
+    def unsubscribe(self, callback: Callable[[int, Set[str]], None]):
+        """Remove a change listener"""
+        with self._lock.write_locked():
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    @contextmanager
+    def _writing(self):
+        """
+        Write lock of the store plus the feed lock shared with other processes
+        Re-reads the file first if another process wrote it; yields the desk ids that reload changed.
+        """
+        with self._lock.write_locked(), self.feed.locked():
+            geladen: Set[str] = set()
+            if self._config is None:
+                self._load()
+            elif file_signature(self.path) != self._signatur:
+                geladen = self._load()[1]
+            yield geladen
+
+    def _ensure_loaded(self):
+        if self._config is not None:
+            return
+        with self._lock.write_locked():
+            if self._config is None:
+                self._load()
+
+    def _reload_if_stale(self):
+        """Pick up edits made to the file outside of the store (e.g. by hand)"""
+        if self._config is None:
+            self._ensure_loaded()
+            return
+        if file_signature(self.path) == self._signatur:
+            return
+        with self._lock.write_locked():
+            if file_signature(self.path) == self._signatur:
+                return
+            version, changed = self._load()
+        self._notify(version, changed)
+
+    def _load(self) -> Tuple[int, Set[str]]:
+        # Caller holds the write lock
+        with self.feed.locked():
+            old_config, old_signatur = self._config, self._signatur
+            old_ids = set(old_config.get("tische", {})) if old_config else set()
+            self._config = config_from_json(load_config(self.path))
+            self._signatur = file_signature(self.path)
+            if self.feed.last_signature == self._signatur:
+                # Written (and recorded) by another store
+                pass
+            elif old_config is not None and self.feed.last_signature == old_signatur:
+                self.feed.append(diff_snapshots(old_config, self._config), self._signatur)
+            else:
+                # Changed outside of any store after changes this store has not seen, the diff is unknown
+                self.feed.reset(self._signatur)
+        changed = old_ids | set(self._config.get("tische", {}))
+        self._version += 1
+        self._history.append((self._version, frozenset(changed)))
+        return self._version, changed
+
+    def _commit(self, new_config: Dict[str, Any], changed: Set[str]) -> int:
+        # Caller holds the write lock and the feed lock
+        write_config(new_config, self.path)
+        self._signatur = file_signature(self.path)
+        self.feed.append(diff_snapshots(self._config, new_config), self._signatur)
+        self._config = new_config
+        self._version += 1
+        self._history.append((self._version, frozenset(changed)))
+        return self._version
+
+    def _notify(self, version: int, changed: Set[str]):
+        with self._lock.read_locked():
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback(version, changed)
+
+_stores: Dict[str, ConfigStore] = {}
+_store_lock = threading.Lock()
+
+def get_store(room_id: str = DEFAULT_ROOM) -> ConfigStore:
+    """Return the process-wide configuration store of a room"""
+    store = _stores.get(room_id)
+    if store is None:
+        with _store_lock:
+            store = _stores.get(room_id)
+            if store is None:
+                store = ConfigStore(room_file(room_id), room_id=room_id)
+                _stores[room_id] = store
+    return store
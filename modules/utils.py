@@ -1,11 +1,14 @@
 """
 Utility functions for G120 Desk Planning System
+
+Data layer only: this module must not import Streamlit, so headless
+scripts and workers can load and save the configuration cheaply.
 """
 import json
 import os
-import streamlit as st
-from typing import Dict, Any
-from modules.config import DATA_FILE
+from typing import Dict, Any, Optional, Tuple
+from modules import instrumentation
+from modules.config import DATA_FILE, DEFAULT_ROOM
 
 # Mapping for German to English weekdays
 WEEKDAY_MAPPING = {
@@ -41,59 +44,89 @@ COMPUTER_TYPE_MAPPING = {
     "None": "None"  # Already migrated
 }
 
-def load_config() -> Dict[str, Any]:
-    """Load desk configuration from JSON file"""
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    (inode, mtime in ns, size) of a file, None if it does not exist
+    Detects a replaced or rewritten file even where timestamps are coarse.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def load_config(path: str = DATA_FILE) -> Dict[str, Any]:
+    """Load desk configuration from JSON file (empty configuration if the file is missing)"""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
             config = json.load(f)
+        instrumentation.count_read(path)
         
         # Migrate German to English weekdays
         config = migrate_weekdays(config)
         
         return config
     else:
-        st.error(f"Configuration file {DATA_FILE} not found!")
         return {"tische": {}}
 
+@instrumentation.timed()
 def migrate_weekdays(config: Dict[str, Any]) -> Dict[str, Any]:
     """Migrate German names to English (weekdays, desk types, computer modes)"""
     tische = config.get("tische", {})
     
     for desk_id, desk_data in tische.items():
+        # Entries that are no dicts or hold no strings are left for the integrity check to report
+        if not isinstance(desk_data, dict):
+            continue
+
         # Migrate desk type
-        if "typ" in desk_data and desk_data["typ"] in DESK_TYPE_MAPPING:
+        if isinstance(desk_data.get("typ"), str) and desk_data["typ"] in DESK_TYPE_MAPPING:
             desk_data["typ"] = DESK_TYPE_MAPPING[desk_data["typ"]]
         
         # Migrate computer type
-        if "rechner" in desk_data:
-            rechner = desk_data["rechner"]
-            if "typ" in rechner and rechner["typ"] in COMPUTER_TYPE_MAPPING:
+        rechner = desk_data.get("rechner")
+        if isinstance(rechner, dict):
+            if isinstance(rechner.get("typ"), str) and rechner["typ"] in COMPUTER_TYPE_MAPPING:
                 rechner["typ"] = COMPUTER_TYPE_MAPPING[rechner["typ"]]
         
         # Migrate bookings (weekdays and computer modes)
-        if "buchungen" in desk_data:
-            buchungen = desk_data["buchungen"]
+        buchungen = desk_data.get("buchungen")
+        if isinstance(buchungen, dict):
             for booking_id, booking in buchungen.items():
+                if not isinstance(booking, dict):
+                    continue
+
                 # Migrate weekday
-                if "tag" in booking and booking["tag"] in WEEKDAY_MAPPING:
+                if isinstance(booking.get("tag"), str) and booking["tag"] in WEEKDAY_MAPPING:
                     booking["tag"] = WEEKDAY_MAPPING[booking["tag"]]
                 
                 # Migrate computer mode
-                if "rechner_modus" in booking and booking["rechner_modus"] in COMPUTER_MODE_MAPPING:
+                if isinstance(booking.get("rechner_modus"), str) and booking["rechner_modus"] in COMPUTER_MODE_MAPPING:
                     booking["rechner_modus"] = COMPUTER_MODE_MAPPING[booking["rechner_modus"]]
     
     return config
 
-def save_config(config: Dict[str, Any]):
-    """Save desk configuration to JSON file"""
-    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
+def save_config(config: Dict[str, Any], room_id: str = DEFAULT_ROOM):
+    """Save the complete desk configuration of a room through the shared store"""
+    from modules.store import get_store
+    get_store(room_id).replace(config)
+
+def write_config(config: Dict[str, Any], path: str = DATA_FILE):
+    """Write desk configuration to JSON file (desks may be plain dicts or the Desk objects of the store)"""
+    from modules.models import config_to_json
+    os.makedirs(os.path.dirname(path), exist_ok=True)
     
     # Ensure all configs are saved with migration applied
-    config = migrate_weekdays(config)
+    config = migrate_weekdays(config_to_json(config))
     
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
+    # Write to a temporary file first so readers never see a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(config, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    instrumentation.count_write(path)
 
+@instrumentation.timed()
 def get_desk_status(tisch_data: Dict) -> tuple:
     """
     Determine desk status based on booking type
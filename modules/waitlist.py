@@ -0,0 +1,242 @@
+"""
+Waitlist for booked time slots
+
+Users can wait for a slot of one desk or for any desk of the room that
+matches their requirements (computer type, minimum number of screens).
+If such a desk is already free when joining, it is booked right away.
+
+Entries are kept in an append-only event log next to the room shard
+(e.g. data/tische_config.waitlist.jsonl), so joining and leaving append
+one line instead of rewriting the shard:
+
+    {"neu": {entry}}
+    {"entfernt": id, "grund": "verlassen" | "gebucht", "tisch": desk id}
+
+In memory every (desk, day, slot) and every requirement group of a
+(day, slot) has its own priority queue. Promoting the next person for a
+freed slot looks at the desk's queue and the few requirement groups of
+that slot, O(k log n) for k groups. Entries that left are skipped when
+they reach the top of a queue (lazy deletion).
+
+Freed slots are reported with notify_freed(); a background worker thread
+assigns them to the next waiting person right away.
+"""
+import heapq
+import os
+import queue
+import threading
+import traceback
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from modules.bookings import add_bookings, new_booking
+from modules.config import COMPUTER_MODES, WAITLIST_SUFFIX
+from modules.jsonlog import JsonLog
+from modules.rooms import desk_matches, free_desks_in_room
+from modules.store import get_store
+
+# The log is compacted when it has this many lines more than twice the waiting entries
+COMPACT_MIN_LINES = 64
+
+def waitlist_path(shard_path: str) -> str:
+    """Waitlist log of a shard"""
+    return os.path.splitext(shard_path)[0] + WAITLIST_SUFFIX
+
+class Waitlist:
+    """Waitlist of one room, shared by all processes writing the room"""
+
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self._lock = threading.Lock()
+        self._log = JsonLog(waitlist_path(get_store(room_id).path))
+        self._lines = 0
+        self._next_id = 1
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        # (desk, day, slot) -> heap of (priority, id)
+        self._desk_heaps: Dict[Tuple[str, str, str], List[Tuple[int, int]]] = {}
+        # (day, slot) -> (computer type, min screens) -> heap of (priority, id)
+        self._any_heaps: Dict[Tuple[str, str], Dict[tuple, List[Tuple[int, int]]]] = {}
+
+    def entries(self, tisch_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Waiting entries in order of priority (optionally only for one desk)"""
+        with self._lock:
+            self._sync()
+            eintraege = [
+                e for e in self._entries.values()
+                if tisch_id is None or e.get("tisch") in (tisch_id, None)
+            ]
+        return sorted(eintraege, key=lambda e: (e["prioritaet"], e["id"]))
+
+    def join(self, person: str, tag: str, zeitslot: str, tisch_id: Optional[str] = None,
+             rechner_typ: Optional[str] = None, min_bildschirme: int = 0,
+             rechner_modus: str = COMPUTER_MODES[0], notizen: str = "", prioritaet: int = 0) -> Dict[str, Any]:
+        """
+        Join the waitlist for a slot
+        tisch_id=None waits for any desk of the room matching rechner_typ and min_bildschirme.
+        Lower prioritaet is served first, equal priorities in joining order.
+        If a matching desk is free, it is booked instead of waiting: the returned entry then has
+        "gebucht" set to that desk and no "id".
+        Raises ValueError if tisch_id is given but is no schedule desk of the room.
+        """
+        eintrag = {
+            "person": person,
+            "tag": tag,
+            "zeitslot": zeitslot,
+            "tisch": tisch_id,
+            "rechner_typ": rechner_typ,
+            "min_bildschirme": min_bildschirme,
+            "rechner_modus": rechner_modus,
+            "notizen": notizen,
+            "prioritaet": prioritaet,
+            "erstellt_am": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        with self._lock, self._log.locked():
+            self._sync()
+            if tisch_id is not None:
+                if self._book(eintrag, tisch_id):
+                    return {**eintrag, "gebucht": tisch_id}
+            else:
+                for frei in free_desks_in_room(self.room_id, tag, zeitslot, rechner_typ, min_bildschirme):
+                    try:
+                        if self._book(eintrag, frei["desk"]):
+                            return {**eintrag, "gebucht": frei["desk"]}
+                    except ValueError:
+                        # Removed or changed meanwhile
+                        continue
+
+            eintrag["id"] = self._next_id
+            self._log.append([{"neu": eintrag}])
+            self._apply({"neu": eintrag})
+        return eintrag
+
+    def leave(self, entry_id: int) -> bool:
+        """Remove an entry, returns False if it does not exist"""
+        with self._lock, self._log.locked():
+            self._sync()
+            if entry_id not in self._entries:
+                return False
+            self._remove(entry_id, "verlassen")
+        return True
+
+    def promote(self, tisch_id: str, tag: str, zeitslot: str) -> Optional[Dict[str, Any]]:
+        """Book a free slot for the next waiting person, returns the promoted entry"""
+        with self._lock, self._log.locked():
+            self._sync()
+            _, config = get_store(self.room_id).snapshot()
+            tisch = config.get("tische", {}).get(tisch_id)
+            if tisch is None or tisch.get("typ", "schedule") != "schedule":
+                return None
+
+            # Candidate heaps: this desk and the requirement groups of this slot the desk fulfils
+            heaps = [self._desk_heaps.get((tisch_id, tag, zeitslot))]
+            for (rechner_typ, min_bildschirme), heap in self._any_heaps.get((tag, zeitslot), {}).items():
+                if desk_matches(tisch, rechner_typ, min_bildschirme):
+                    heaps.append(heap)
+
+            best_heap = None
+            for heap in heaps:
+                if heap and self._top(heap) is not None and (best_heap is None or heap[0] < best_heap[0]):
+                    best_heap = heap
+            if best_heap is None:
+                return None
+
+            eintrag = self._entries[best_heap[0][1]]
+            # Atomic in the store: fails if the slot was booked again meanwhile
+            if not self._book(eintrag, tisch_id):
+                return None
+            heapq.heappop(best_heap)
+            self._remove(eintrag["id"], "gebucht", tisch_id)
+        return eintrag
+
+    def _book(self, eintrag: Dict[str, Any], tisch_id: str) -> bool:
+        """Book the slot of an entry on a desk, False if it is taken"""
+        _, config = get_store(self.room_id).snapshot()
+        rechner = config.get("tische", {}).get(tisch_id, {}).get("rechner", {})
+        key, buchung = new_booking(
+            eintrag["person"], eintrag["tag"], eintrag["zeitslot"],
+            eintrag["rechner_modus"] if rechner.get("vorhanden", False) else COMPUTER_MODES[3],
+            eintrag["notizen"]
+        )
+        return not add_bookings(self.room_id, tisch_id, {key: buchung})
+
+    def _top(self, heap: List[Tuple[int, int]]) -> Optional[int]:
+        # Drop entries that left the waitlist (lazy deletion)
+        while heap and heap[0][1] not in self._entries:
+            heapq.heappop(heap)
+        return heap[0][1] if heap else None
+
+    def _remove(self, entry_id: int, grund: str, tisch_id: Optional[str] = None):
+        ereignis = {"entfernt": entry_id, "grund": grund}
+        if tisch_id is not None:
+            ereignis["tisch"] = tisch_id
+        self._log.append([ereignis])
+        self._apply(ereignis)
+        if self._lines > 2 * len(self._entries) + COMPACT_MIN_LINES:
+            eintraege = sorted(self._entries.values(), key=lambda e: e["id"])
+            self._log.rewrite({"neu": e} for e in eintraege)
+            self._lines = len(eintraege)
+
+    def _apply(self, ereignis: Dict[str, Any]):
+        self._lines += 1
+        if "neu" in ereignis:
+            eintrag = dict(ereignis["neu"])
+            self._entries[eintrag["id"]] = eintrag
+            self._next_id = max(self._next_id, eintrag["id"] + 1)
+            item = (eintrag["prioritaet"], eintrag["id"])
+            if eintrag.get("tisch") is not None:
+                key = (eintrag["tisch"], eintrag["tag"], eintrag["zeitslot"])
+                heapq.heappush(self._desk_heaps.setdefault(key, []), item)
+            else:
+                signatur = (eintrag.get("rechner_typ"), eintrag.get("min_bildschirme", 0))
+                gruppen = self._any_heaps.setdefault((eintrag["tag"], eintrag["zeitslot"]), {})
+                heapq.heappush(gruppen.setdefault(signatur, []), item)
+        else:
+            # The heap item is skipped lazily when it reaches the top
+            self._entries.pop(ereignis["entfernt"], None)
+
+    def _sync(self):
+        """Apply the events other processes appended (all of them if the log was compacted)"""
+        ersetzt, ereignisse = self._log.read()
+        if ersetzt:
+            self._lines = 0
+            self._entries.clear()
+            self._desk_heaps.clear()
+            self._any_heaps.clear()
+        for ereignis in ereignisse:
+            self._apply(ereignis)
+
+_waitlists: Dict[str, Waitlist] = {}
+_waitlists_lock = threading.Lock()
+
+def get_waitlist(room_id: str) -> Waitlist:
+    """Return the process-wide waitlist of a room"""
+    with _waitlists_lock:
+        if room_id not in _waitlists:
+            _waitlists[room_id] = Waitlist(room_id)
+        return _waitlists[room_id]
+
+_freed_slots: "queue.Queue[tuple]" = queue.Queue()
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+
+def _work():
+    while True:
+        room_id, tisch_id, tag, zeitslot = _freed_slots.get()
+        try:
+            get_waitlist(room_id).promote(tisch_id, tag, zeitslot)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            _freed_slots.task_done()
+
+def notify_freed(room_id: str, tisch_id: str, tag: str, zeitslot: str):
+    """Report a freed slot, the background worker assigns it to the next waiting person"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_work, name="waitlist-worker", daemon=True)
+            _worker.start()
+    _freed_slots.put((room_id, tisch_id, tag, zeitslot))
+
+def wait_until_processed():
+    """Block until all reported slots have been handled (for scripts and tests)"""
+    _freed_slots.join()
@@ -0,0 +1,30 @@
+"""
+Shared fixtures: every test runs in its own data directory with fresh stores
+"""
+import json
+import pytest
+from modules import rooms, store, waitlist
+
+def make_desk(typ: str = "schedule", rechner_typ: str = "GPU", bildschirme: int = 2, **felder) -> dict:
+    tisch = {
+        "name": "Desk",
+        "typ": typ,
+        "rechner": {"vorhanden": rechner_typ != "None", "typ": rechner_typ, "name": "",
+                    "abschaltbar": True, "bildschirme": bildschirme}
+    }
+    if typ == "schedule":
+        tisch["buchungen"] = {}
+    tisch.update(felder)
+    return tisch
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Temporary working directory with data/tische_config.json holding desks 0-3"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    config = {"tische": {str(i): make_desk(name=f"Desk {i}") for i in range(4)}}
+    (tmp_path / "data" / "tische_config.json").write_text(json.dumps(config), encoding="utf-8")
+    monkeypatch.setattr(store, "_stores", {})
+    monkeypatch.setattr(rooms, "_rooms_cache", None)
+    monkeypatch.setattr(waitlist, "_waitlists", {})
+    return tmp_path
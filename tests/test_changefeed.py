@@ -0,0 +1,192 @@
+import copy
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import pytest
+from pathlib import Path
+from modules import store as store_module
+from modules.changefeed import ChangeFeed, apply_diff, apply_sync, compact_ops, diff_snapshots, sync
+from modules.config import TIMESLOTS, WEEKDAYS
+from modules.models import config_to_json
+from modules.store import ConfigStore, get_store
+from tests.conftest import make_desk
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def revisions(path: str) -> list:
+    """Revisions of all entries in a feed file"""
+    with open(path, encoding="utf-8") as f:
+        return [eintrag["rev"] for eintrag in map(json.loads, f) if "rev" in eintrag]
+
+def random_edit(rnd: random.Random, config: dict) -> dict:
+    """config with one random desk, field, booking or top-level change"""
+    neu = copy.deepcopy(config_to_json(config))
+    tische = neu["tische"]
+    art = rnd.choice(["buchung", "buchung", "buchung_entfernt", "feld", "feld_entfernt", "tisch_neu",
+                      "tisch_entfernt", "extra"])
+    tisch_id = rnd.choice(sorted(tische)) if tische else None
+    if art == "tisch_neu" or tisch_id is None:
+        tische[str(rnd.randrange(100))] = make_desk(name=f"Desk {rnd.randrange(100)}")
+    elif art == "tisch_entfernt":
+        del tische[tisch_id]
+    elif art == "buchung":
+        tag, slot = rnd.choice(WEEKDAYS), rnd.choice(TIMESLOTS)
+        tische[tisch_id].setdefault("buchungen", {})[f"{tag}_{slot}_{rnd.randrange(5)}"] = {
+            "person": f"Person {rnd.randrange(10)}", "tag": tag, "zeitslot": slot}
+    elif art == "buchung_entfernt" and tische[tisch_id].get("buchungen"):
+        del tische[tisch_id]["buchungen"][rnd.choice(sorted(tische[tisch_id]["buchungen"]))]
+    elif art == "feld":
+        feld = rnd.choice(["name", "gebucht_von", "buchungen"])
+        tische[tisch_id][feld] = {} if feld == "buchungen" else f"Wert {rnd.randrange(10)}"
+    elif art == "feld_entfernt":
+        tische[tisch_id].pop(rnd.choice(["name", "gebucht_von", "buchungen"]), None)
+    else:
+        neu[f"extra_{rnd.randrange(3)}"] = rnd.randrange(10)
+    return neu
+
+def test_diff_and_compacted_diffs_round_trip():
+    rnd = random.Random(3)
+    config = {"tische": {str(i): make_desk() for i in range(4)}}
+    for _ in range(50):
+        start, ops = config, []
+        for _ in range(rnd.randrange(1, 8)):
+            neu = random_edit(rnd, config)
+            diff = diff_snapshots(config, neu)
+            assert apply_diff(config, diff) == neu
+            ops.extend(diff)
+            config = neu
+        assert apply_diff(start, compact_ops(ops)) == config
+
+def test_consumer_stays_in_sync(data_dir):
+    rnd = random.Random(5)
+    store = get_store()
+    antwort = sync()
+    kopie = apply_sync(None, antwort)
+    for schritt in range(200):
+        _, config = store.snapshot()
+        store.replace(random_edit(rnd, config))
+        if schritt % 7 == 0:
+            antwort = sync(since=antwort["revision"], feed_id=antwort["feed"])
+            assert "ops" in antwort
+            kopie = apply_sync(kopie, antwort)
+            assert kopie == store.snapshot()[1]
+
+def test_since_after_truncation_and_restart(tmp_path):
+    path = str(tmp_path / "raum.changes.jsonl")
+    feed = ChangeFeed(path, max_entries=10)
+    for i in range(25):
+        feed.append([{"op": "extra", "key": "n", "wert": i}], (1, i, 100))
+    assert feed.revision == 25
+    assert feed.since(3) is None
+    assert [e["rev"] for e in feed.since(22)] == [23, 24, 25]
+
+    neu = ChangeFeed(path, max_entries=10)
+    assert (neu.feed_id, neu.revision) == (feed.feed_id, 25)
+    assert [e["ops"][0]["wert"] for e in neu.since(23)] == [23, 24]
+    assert neu.append([], (1, 25, 100)) == 26
+    assert feed.since(25)[0]["rev"] == 26
+
+def test_revisions_continue_after_store_restart(data_dir, monkeypatch):
+    store = get_store()
+    store.update_desks({"1": make_desk(name="Neu")})
+    antwort = sync()
+
+    monkeypatch.setattr(store_module, "_stores", {})
+    get_store().update_desks({"2": make_desk(name="Auch neu")})
+    weiter = sync(since=antwort["revision"], feed_id=antwort["feed"])
+    assert weiter["revision"] == antwort["revision"] + 1
+    assert apply_sync(apply_sync(None, antwort), weiter) == get_store().snapshot()[1]
+
+def test_sync_since_reads_only_the_feed(data_dir, monkeypatch):
+    get_store().update_desks({"1": make_desk(name="Neu")})
+    antwort = sync()
+    get_store().update_desks({"2": make_desk(name="Auch neu")})
+
+    # A fresh process answers from the feed file without parsing the shard
+    store_module._stores.clear()
+    monkeypatch.setattr(store_module, "load_config", lambda path: pytest.fail("shard parsed"))
+    weiter = sync(since=antwort["revision"], feed_id=antwort["feed"])
+    assert [op["tisch"] for op in weiter["ops"]] == ["2"]
+    assert get_store()._config is None
+
+def test_edit_by_hand_resets_consumers(data_dir):
+    antwort = sync()
+    path = data_dir / "data" / "tische_config.json"
+    config = json.loads(path.read_text(encoding="utf-8"))
+    config["tische"]["1"]["name"] = "Von Hand"
+    path.write_text(json.dumps(config), encoding="utf-8")
+
+    # Another process must not be confused by the offline edit either
+    store_module._stores.clear()
+    weiter = sync(since=antwort["revision"], feed_id=antwort["feed"])
+    assert weiter["snapshot"]["tische"]["1"]["name"] == "Von Hand"
+
+def test_edit_by_hand_with_same_mtime_is_noticed(data_dir):
+    # Coarse timestamps: the edit keeps the mtime, only size or inode tell it apart
+    antwort = sync()
+    path = data_dir / "data" / "tische_config.json"
+    stat = path.stat()
+    config = json.loads(path.read_text(encoding="utf-8"))
+    config["tische"]["1"]["name"] = "Von Hand geändert"
+    path.write_text(json.dumps(config), encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert get_store().snapshot()[1]["tische"]["1"]["name"] == "Von Hand geändert"
+    weiter = sync(since=antwort["revision"], feed_id=antwort["feed"])
+    assert apply_sync(apply_sync(None, antwort), weiter)["tische"]["1"]["name"] == "Von Hand geändert"
+
+def test_two_stores_on_one_room_write_unique_revisions(data_dir):
+    path = "data/tische_config.json"
+    stores = [ConfigStore(path), ConfigStore(path)]
+    antwort = sync()
+    start = threading.Barrier(2)
+
+    def write(store: ConfigStore, nummer: int):
+        start.wait()
+        for i in range(30):
+            store.modify_desk(str(nummer), lambda tisch: {**tisch, "buchungen": {
+                **tisch["buchungen"], f"Monday_{TIMESLOTS[i % 12]}_{i}": {"tag": "Monday", "zeitslot": TIMESLOTS[i % 12]}}})
+
+    threads = [threading.Thread(target=write, args=(store, n)) for n, store in enumerate(stores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    revisionen = revisions(stores[0].feed.path)
+    assert revisionen == list(range(1, len(revisionen) + 1))
+    # No write of one store overwrote the bookings of the other
+    _, config = ConfigStore(path).snapshot()
+    assert len(config["tische"]["0"]["buchungen"]) == len(config["tische"]["1"]["buchungen"]) == 30
+    assert apply_sync(apply_sync(None, antwort), sync(since=antwort["revision"], feed_id=antwort["feed"])) == config
+
+WRITER = """
+import sys
+from modules.store import ConfigStore
+store = ConfigStore("data/tische_config.json")
+for i in range(int(sys.argv[1])):
+    store.update_desks({"2": {**store.snapshot()[1]["tische"]["2"], "name": f"Prozess {i}"}})
+"""
+
+def test_writer_process_and_store_write_unique_revisions(data_dir):
+    store = get_store()
+    antwort = sync()
+    prozess = subprocess.Popen([sys.executable, "-c", WRITER, "100"], cwd=data_dir,
+                               env={"PYTHONPATH": str(ROOT)})
+    # Keep writing until the other process is done, so the writes interleave
+    i = 0
+    while prozess.poll() is None or i < 20:
+        store.update_desks({"3": make_desk(name=f"Hier {i}")})
+        i += 1
+    assert prozess.wait(timeout=60) == 0
+
+    revisionen = revisions(store.feed.path)
+    assert revisionen == list(range(1, len(revisionen) + 1))
+    _, config = store.snapshot()
+    assert config["tische"]["2"]["name"] == "Prozess 99"
+    assert config["tische"]["3"]["name"] == f"Hier {i - 1}"
+    weiter = sync(since=antwort["revision"], feed_id=antwort["feed"])
+    assert apply_sync(apply_sync(None, antwort), weiter) == config
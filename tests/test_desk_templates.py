@@ -0,0 +1,15 @@
+from modules.desk_templates import desk_to_row, row_to_desk, validate_desk
+from tests.conftest import make_desk
+
+def test_row_without_computer_resets_computer_fields():
+    tisch = make_desk(rechner_typ="GPU")
+    row = {**desk_to_row("7", tisch), "computer": False, "computer_name": "WS-7", "abschaltbar": True}
+    neuer_tisch = row_to_desk(tisch, row)
+    assert neuer_tisch["rechner"] == {
+        "vorhanden": False, "typ": "None", "name": "", "abschaltbar": False, "bildschirme": tisch["rechner"]["bildschirme"]}
+    assert validate_desk("7", neuer_tisch) == []
+
+def test_desk_without_computer_but_with_type_is_rejected():
+    tisch = make_desk(rechner_typ="GPU")
+    tisch["rechner"]["vorhanden"] = False
+    assert validate_desk("7", tisch) == ["Desk 7: a desk without computer must have computer type None"]
@@ -0,0 +1,42 @@
+import cProfile
+import logging
+import threading
+from modules import instrumentation
+
+def profiled_reruns(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, "CPROFILE", True)
+    monkeypatch.setattr(instrumentation, "SLOW_RERUN_MS", 0)
+    monkeypatch.setattr(instrumentation, "PROFILE_DUMP_DIR", str(tmp_path))
+    monkeypatch.setattr(instrumentation, "_get_logger", lambda: logging.getLogger("g120.test"))
+
+def test_only_one_rerun_at_a_time_is_profiled(tmp_path, monkeypatch):
+    profiled_reruns(tmp_path, monkeypatch)
+    innen = []
+
+    def rerun():
+        with instrumentation._rerun() as stats:
+            innen.append(stats)
+
+    with instrumentation._rerun() as aussen:
+        thread = threading.Thread(target=rerun)
+        thread.start()
+        thread.join()
+    assert aussen.profile_file is not None
+    assert innen[0].profile_file is None and innen[0].total_ms >= 0
+
+    with instrumentation._rerun() as danach:
+        pass
+    assert danach.profile_file is not None
+
+def test_rerun_runs_unprofiled_if_another_profiler_is_active(tmp_path, monkeypatch):
+    profiled_reruns(tmp_path, monkeypatch)
+
+    class BusyProfile(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(cProfile, "Profile", BusyProfile)
+    with instrumentation._rerun() as stats:
+        pass
+    assert stats.profile_file is None
+    assert not instrumentation._profiler_lock.locked()
@@ -0,0 +1,131 @@
+import copy
+import json
+import sys
+import pytest
+from benchmarks.generate_plan import generate_plan
+from modules import integrity
+from modules.integrity import IntegrityMonitor, check_config, check_desk, repair_desk
+from modules.models import Desk
+from modules.store import get_store
+from tests.conftest import make_desk
+
+def booking(tag: str = "Monday", zeitslot: str = "08:00-09:00", erstellt_am: str = "2025-01-01 10:00:00") -> dict:
+    return {"person": "Anna", "tag": tag, "zeitslot": zeitslot, "erstellt_am": erstellt_am}
+
+# Rule, desk violating it, whether it is repairable, check of the repaired desk
+CASES = [
+    ("desk_type", make_desk(typ="stundenplan", buchungen={}), True, lambda t: t["typ"] == "schedule"),
+    ("desk_type", make_desk(typ="lounge"), False, None),
+    ("computer_type", make_desk(rechner_typ="Leer"), True, lambda t: t["rechner"]["typ"] == "None"),
+    ("computer_type", make_desk(rechner_typ="TPU"), True, lambda t: t["rechner"]["typ"] == "None"),
+    ("screen_count", make_desk(bildschirme=5), True, lambda t: t["rechner"]["bildschirme"] == 2),
+    ("screen_count", make_desk(bildschirme=-1), True, lambda t: t["rechner"]["bildschirme"] == 0),
+    ("screen_count", make_desk(bildschirme=True), True, lambda t: t["rechner"]["bildschirme"] == 0),
+    ("booking_slot", make_desk(buchungen={"a": booking(tag="Montag")}), True,
+     lambda t: t["buchungen"]["a"]["tag"] == "Monday"),
+    ("booking_slot", make_desk(buchungen={"a": booking(zeitslot="07:00-08:00")}), False, None),
+    ("booking_slot", make_desk(buchungen={"kaputt": "not a booking"}), False, None),
+    ("booking_slot", make_desk(buchungen={"a": booking(tag=["Monday"]), "b": booking(zeitslot={})}), False, None),
+    ("booking_on_full_desk", make_desk(typ="fullbooking", buchungen={"a": booking()}), True,
+     lambda t: "buchungen" not in t),
+    ("double_booking", make_desk(buchungen={"spaet": booking(erstellt_am="2025-01-02 10:00:00"), "frueh": booking()}),
+     True, lambda t: list(t["buchungen"]) == ["frueh"]),
+    # Unreadable entries are reported or left alone, the rest of the desk is still repaired
+    ("double_booking", make_desk(buchungen={"spaet": booking(erstellt_am="2025-01-02 10:00:00"), "frueh": booking(),
+                                            "kaputt": None}),
+     True, lambda t: list(t["buchungen"]) == ["frueh", "kaputt"]),
+    ("desk_type", make_desk(typ="stundenplan", rechner="kaputt", buchungen={}), True,
+     lambda t: t["typ"] == "schedule" and t["rechner"] == "kaputt"),
+]
+
+@pytest.mark.parametrize("regel, tisch, reparierbar, repariert", CASES)
+def test_rule_check_and_repair(regel, tisch, reparierbar, repariert):
+    verstoesse = [v for v in check_desk("7", tisch) if v.regel == regel]
+    assert verstoesse and all(v.reparierbar == reparierbar and v.tisch == "7" for v in verstoesse)
+
+    original = copy.deepcopy(tisch)
+    neuer_tisch = repair_desk("7", tisch)
+    assert tisch == original
+    if not reparierbar:
+        assert neuer_tisch is None
+        return
+    assert repariert(neuer_tisch)
+    assert not [v for v in check_desk("7", neuer_tisch) if v.reparierbar]
+
+def test_store_desks_are_checked_like_dicts():
+    tisch = make_desk(buchungen={
+        "spaet": booking(erstellt_am="2025-01-02 10:00:00"), "frueh": booking(), "anders": booking(tag="Tuesday"),
+        "frueh_kaputt": booking(zeitslot="07:00-08:00"), "kaputt": booking(zeitslot="07:00-08:00")})
+    assert check_desk("7", Desk.from_dict("7", tisch)) == check_desk("7", tisch)
+    assert [v.buchung for v in check_desk("7", tisch) if v.regel == "double_booking"] == ["spaet", "kaputt"]
+
+def test_unreadable_bookings_do_not_stop_the_monitor(data_dir):
+    monitor = IntegrityMonitor("G120", auto_repair=True)
+    monitor.start()
+    tisch = make_desk(rechner=["kaputt"], buchungen={"kaputt": "not a booking", "a": booking(tag=["Monday"])})
+    get_store().update_desks({"1": tisch})
+    assert [(v.regel, v.buchung) for v in monitor.violations()] == [("booking_slot", "kaputt"), ("booking_slot", "a")]
+    assert check_desk("1", Desk.from_dict("1", tisch)) == check_desk("1", tisch)
+
+def test_generated_plan_has_no_violations():
+    assert check_config(generate_plan(50, 40, weekend=True, seed=1)) == []
+
+def test_monitor_rechecks_only_touched_desks(data_dir, monkeypatch):
+    monitor = IntegrityMonitor("G120", auto_repair=False)
+    monitor.start()
+    assert monitor.violations() == []
+
+    geprueft = []
+    pruefen = integrity.check_desk
+    monkeypatch.setattr(integrity, "check_desk", lambda tisch_id, tisch: geprueft.append(tisch_id) or pruefen(tisch_id, tisch))
+    get_store().update_desks({"2": make_desk(bildschirme=7), "3": make_desk(typ="lounge")})
+    assert sorted(geprueft) == ["2", "3"]
+    assert [(v.regel, v.tisch) for v in monitor.violations()] == [("screen_count", "2"), ("desk_type", "3")]
+
+    geprueft.clear()
+    get_store().update_desks({"2": make_desk()}, removed=["3"])
+    # Removed desks are not checked, their violations are dropped
+    assert geprueft == ["2"]
+    assert monitor.violations() == []
+
+def test_monitor_repairs_automatically(data_dir):
+    IntegrityMonitor("G120", auto_repair=True).start()
+    get_store().update_desks({"1": make_desk(rechner_typ="Leer", bildschirme=9)})
+    _, config = get_store().snapshot()
+    assert config["tische"]["1"]["rechner"]["typ"] == "None"
+    assert config["tische"]["1"]["rechner"]["bildschirme"] == 2
+
+def test_monitor_repair_keeps_other_changes(data_dir):
+    monitor = IntegrityMonitor("G120", auto_repair=False)
+    monitor.start()
+    get_store().update_desks({"1": make_desk(bildschirme=9, buchungen={"a": booking()})})
+    assert monitor.repair() == 1
+    _, config = get_store().snapshot()
+    assert config["tische"]["1"]["rechner"]["bildschirme"] == 2
+    assert list(config["tische"]["1"]["buchungen"]) == ["a"]
+    assert monitor.violations() == []
+
+def test_command_line_fix_writes_through_the_store(data_dir, monkeypatch):
+    # "Leer" is already migrated when the store loads the file, the desk must still be written back
+    path = data_dir / "data" / "tische_config.json"
+    config = json.loads(path.read_text(encoding="utf-8"))
+    config["tische"]["1"]["rechner"]["typ"] = "Leer"
+    path.write_text(json.dumps(config), encoding="utf-8")
+
+    monkeypatch.setattr(sys, "argv", ["integrity", "--room", "G120", "--fix"])
+    integrity.main()
+    config = json.loads(path.read_text(encoding="utf-8"))
+    assert config["tische"]["1"]["rechner"]["typ"] == "None"
+    assert check_config(config) == []
+
+def test_command_line_reports_unreadable_bookings(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps({"tische": {"1": make_desk(typ="stundenplan", buchungen={"kaputt": "not a booking"})}}),
+                    encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["integrity", "--file", str(path), "--fix", "--json"])
+    with pytest.raises(SystemExit):
+        integrity.main()
+    bericht = json.loads(capsys.readouterr().out)[str(path)]
+    assert bericht["repaired_desks"] == 1
+    assert [(v["regel"], v["buchung"]) for v in bericht["violations"]] == [("booking_slot", "kaputt")]
+    assert json.loads(path.read_text(encoding="utf-8"))["tische"]["1"]["typ"] == "schedule"
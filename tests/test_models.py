@@ -0,0 +1,82 @@
+import json
+import random
+from benchmarks.generate_plan import generate_plan
+from modules.bookings import add_bookings, delete_booking, new_booking
+from modules.models import (Booking, BookingMap, Desk, bookings_of, desks_from_config, desks_to_config,
+                            invalid_bookings)
+from modules.store import get_store
+from tests.conftest import make_desk
+
+def test_round_trip_of_generated_plan():
+    plan = generate_plan(50, 40, weekend=True, seed=1)
+    assert desks_to_config(desks_from_config(plan)) == {"tische": plan["tische"]}
+
+def test_round_trip_keeps_missing_and_unknown_keys():
+    tisch = {
+        "typ": "schedule",
+        "farbe": "blau",
+        "projekt_name": None,
+        "rechner": {"typ": "GPU", "seriennummer": 42},
+        "buchungen": {
+            "Monday_08:00-09:00_20240101120000000000": {"tag": "Monday", "zeitslot": "08:00-09:00", "raum": 3},
+            "Tuesday_08:00-09:00_1": {"person": "Anna", "tag": "Tuesday", "zeitslot": "08:00-09:00",
+                                      "rechner_modus": "Overclocked"},
+            "kaputt": {"person": "Ben", "tag": "Funday", "zeitslot": "08:00-09:00"},
+        }
+    }
+    assert Desk.from_dict("1", tisch).to_dict() == tisch
+
+def test_unparseable_bookings_are_skipped_and_listed():
+    buchungen = {
+        "a": {"person": "Anna", "tag": "Monday", "zeitslot": "08:00-09:00"},
+        "b": {"person": "Ben", "tag": "Monday"},
+        "c": {"person": "Cem", "tag": "Funday", "zeitslot": "08:00-09:00"},
+        "d": "not a booking",
+    }
+    assert [b.person for b in bookings_of(buchungen)] == ["Anna"]
+    assert [key for key, _ in invalid_bookings(buchungen)] == ["b", "c", "d"]
+
+def test_booking_from_dict_raises_value_error():
+    for data in ({"tag": "Monday"}, {"tag": "Funday", "zeitslot": "08:00-09:00"}, {"tag": ["Monday"]}):
+        try:
+            Booking.from_dict("x", data)
+        except ValueError:
+            continue
+        raise AssertionError(f"{data} was accepted")
+
+def test_unparseable_booking_can_be_deleted_by_raw_key(data_dir):
+    get_store().update_desks({"1": make_desk(buchungen={"kaputt": {"tag": "Funday", "zeitslot": "08:00-09:00"}})})
+    assert delete_booking("G120", "1", "kaputt") == {"tag": "Funday", "zeitslot": "08:00-09:00"}
+    _, config = get_store().snapshot()
+    assert config["tische"]["1"]["buchungen"] == {}
+
+def test_bookings_are_sorted_by_day_and_slot():
+    rnd = random.Random(0)
+    buchungen = generate_plan(1, 60, weekend=True, seed=2)["tische"]["0"]["buchungen"]
+    gemischt = dict(rnd.sample(list(buchungen.items()), len(buchungen)))
+    keys = [b.sort_key for b in bookings_of(gemischt)]
+    assert keys == sorted(keys)
+
+def test_desk_reads_like_its_json_dict():
+    tisch = generate_plan(1, 20, seed=3)["tische"]["0"]
+    desk = Desk.from_dict("0", tisch)
+    assert desk == tisch and tisch == desk
+    assert dict(desk["rechner"]) == tisch["rechner"]
+    key, buchung = next(iter(tisch["buchungen"].items()))
+    assert desk["buchungen"][key] == buchung and desk.get("gebucht_von", "") == ""
+    assert sorted(desk["buchungen"]) == sorted(tisch["buchungen"])
+    assert {**desk, "name": "Neu"} == {**tisch, "name": "Neu"}
+
+def test_store_holds_desk_objects_and_writes_json(data_dir):
+    store = get_store()
+    key, buchung = new_booking("Anna", "Monday", "08:00-09:00", "Screens Only")
+    assert add_bookings("G120", "1", {key: buchung}) == []
+    _, config = store.snapshot()
+    tisch = config["tische"]["1"]
+    assert isinstance(tisch, Desk) and isinstance(tisch["buchungen"], BookingMap)
+    # The store's bookings are used as they are, not converted again
+    assert bookings_of(tisch["buchungen"]) is tisch["buchungen"].bookings
+
+    gespeichert = json.loads((data_dir / "data" / "tische_config.json").read_text(encoding="utf-8"))
+    assert gespeichert["tische"]["1"] == tisch.to_dict()
+    assert gespeichert["tische"]["1"]["buchungen"][key] == buchung
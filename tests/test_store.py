@@ -0,0 +1,61 @@
+import threading
+from modules.bookings import add_bookings, delete_booking, new_booking, update_desk_fields
+from modules.store import get_store
+
+def book_concurrently(slots):
+    """Book every (day, slot) from its own thread, returns the conflicts of each thread"""
+    start = threading.Barrier(len(slots))
+    konflikte = [None] * len(slots)
+
+    def book(i, tag, zeitslot):
+        key, buchung = new_booking(f"Person {i}", tag, zeitslot, "Screens Only")
+        start.wait()
+        konflikte[i] = add_bookings("G120", "1", {key: buchung})
+
+    threads = [threading.Thread(target=book, args=(i, tag, zeitslot)) for i, (tag, zeitslot) in enumerate(slots)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return konflikte
+
+def test_concurrent_bookings_on_one_desk_all_survive(data_dir):
+    slots = [("Monday", f"{h:02d}:00-{h + 1:02d}:00") for h in range(8, 16)]
+    assert book_concurrently(slots) == [[]] * 8
+    _, config = get_store().snapshot()
+    assert len(config["tische"]["1"]["buchungen"]) == 8
+
+def test_concurrent_bookings_of_one_slot_book_it_once(data_dir):
+    konflikte = book_concurrently([("Monday", "08:00-09:00")] * 6)
+    assert sum(1 for k in konflikte if not k) == 1
+    _, config = get_store().snapshot()
+    assert len(config["tische"]["1"]["buchungen"]) == 1
+
+def test_rejected_bookings_write_nothing(data_dir):
+    key, buchung = new_booking("Anna", "Monday", "08:00-09:00", "Screens Only")
+    add_bookings("G120", "1", {key: buchung})
+    version, _ = get_store().snapshot()
+    neu = dict([new_booking("Ben", "Tuesday", "08:00-09:00", "Screens Only"),
+                new_booking("Ben", "Monday", "08:00-09:00", "Screens Only")])
+    assert add_bookings("G120", "1", neu) == [("Monday", "08:00-09:00")]
+    assert get_store().version == version
+
+def test_delete_and_field_update_keep_concurrent_bookings(data_dir):
+    alt_key, alt = new_booking("Anna", "Monday", "08:00-09:00", "Screens Only")
+    add_bookings("G120", "1", {alt_key: alt})
+    # A second session books while the first still shows the old snapshot
+    key, buchung = new_booking("Ben", "Friday", "10:00-11:00", "Screens Only")
+    add_bookings("G120", "1", {key: buchung})
+    assert delete_booking("G120", "1", alt_key)["person"] == "Anna"
+    assert delete_booking("G120", "1", alt_key) is None
+    assert update_desk_fields("G120", "1", {"name": "Renamed"})
+    _, config = get_store().snapshot()
+    assert config["tische"]["1"]["name"] == "Renamed"
+    assert list(config["tische"]["1"]["buchungen"]) == [key]
+
+def test_modify_desk_without_change_writes_nothing(data_dir):
+    store = get_store()
+    version, _ = store.snapshot()
+    assert store.modify_desk("1", lambda tisch: None) is None
+    assert store.modify_desk("missing", lambda tisch: None) is None
+    assert store.version == version
@@ -0,0 +1,117 @@
+from modules.bookings import add_bookings, delete_booking, new_booking
+from modules.store import get_store
+from modules.waitlist import Waitlist, get_waitlist, notify_freed, wait_until_processed
+from tests.conftest import make_desk
+
+SLOT = ("Monday", "08:00-09:00")
+
+def book(tisch_id: str, person: str = "Anna", slot=SLOT) -> str:
+    key, buchung = new_booking(person, *slot, "Screens Only")
+    assert add_bookings("G120", tisch_id, {key: buchung}) == []
+    return key
+
+def free(tisch_id: str, key: str):
+    delete_booking("G120", tisch_id, key)
+
+def persons_on(tisch_id: str, slot=SLOT) -> list:
+    _, config = get_store().snapshot()
+    return [b["person"] for b in config["tische"][tisch_id]["buchungen"].values()
+            if (b["tag"], b["zeitslot"]) == slot]
+
+def test_join_books_a_free_slot_right_away(data_dir):
+    waitlist = Waitlist("G120")
+    eintrag = waitlist.join("Ben", *SLOT, tisch_id="1")
+    assert eintrag["gebucht"] == "1" and "id" not in eintrag
+    assert persons_on("1") == ["Ben"]
+    assert waitlist.entries() == []
+
+def test_join_any_desk_books_a_free_matching_desk(data_dir):
+    get_store().update_desks({"0": make_desk(rechner_typ="CPU"), "2": make_desk(bildschirme=1)})
+    book("1")
+    eintrag = Waitlist("G120").join("Ben", *SLOT, rechner_typ="GPU", min_bildschirme=2)
+    assert eintrag["gebucht"] == "3"
+    assert persons_on("3") == ["Ben"]
+
+def test_promotion_follows_priority_then_joining_order(data_dir):
+    key = book("1")
+    waitlist = Waitlist("G120")
+    for person, prioritaet in [("Ben", 1), ("Cem", 0), ("Dana", 1), ("Eva", 0)]:
+        waitlist.join(person, *SLOT, tisch_id="1", prioritaet=prioritaet)
+    assert [e["person"] for e in waitlist.entries()] == ["Cem", "Eva", "Ben", "Dana"]
+
+    reihenfolge = []
+    for _ in range(4):
+        free("1", key)
+        reihenfolge.append(waitlist.promote("1", *SLOT)["person"])
+        key = next(k for k, b in get_store().snapshot()[1]["tische"]["1"]["buchungen"].items())
+    assert reihenfolge == ["Cem", "Eva", "Ben", "Dana"]
+    assert waitlist.promote("1", *SLOT) is None
+
+def test_left_entries_are_skipped_lazily(data_dir):
+    key = book("1")
+    waitlist = Waitlist("G120")
+    erster = waitlist.join("Ben", *SLOT, tisch_id="1")
+    waitlist.join("Cem", *SLOT, tisch_id="1")
+    assert waitlist.leave(erster["id"])
+    assert not waitlist.leave(erster["id"])
+    # Still in the heap until it reaches the top
+    assert len(waitlist._desk_heaps[("1", *SLOT)]) == 2
+
+    free("1", key)
+    assert waitlist.promote("1", *SLOT)["person"] == "Cem"
+    assert waitlist._desk_heaps[("1", *SLOT)] == []
+
+def test_any_desk_entries_wait_for_a_matching_desk(data_dir):
+    get_store().update_desks({"0": make_desk(rechner_typ="CPU")})
+    keys = {tisch_id: book(tisch_id) for tisch_id in "0123"}
+    waitlist = Waitlist("G120")
+    waitlist.join("Ben", *SLOT, rechner_typ="GPU")
+    waitlist.join("Cem", *SLOT, tisch_id="1", prioritaet=5)
+
+    free("0", keys["0"])
+    assert waitlist.promote("0", *SLOT) is None
+    free("1", keys["1"])
+    assert waitlist.promote("1", *SLOT)["person"] == "Ben"
+    assert persons_on("1") == ["Ben"]
+    assert [e["person"] for e in waitlist.entries()] == ["Cem"]
+
+def test_promote_does_not_overwrite_a_new_booking(data_dir):
+    key = book("1")
+    waitlist = Waitlist("G120")
+    waitlist.join("Ben", *SLOT, tisch_id="1")
+    free("1", key)
+    book("1", "Schneller")
+    assert waitlist.promote("1", *SLOT) is None
+    assert persons_on("1") == ["Schneller"]
+    assert [e["person"] for e in waitlist.entries()] == ["Ben"]
+
+def test_waitlists_of_two_processes_share_the_log(data_dir):
+    key = book("1")
+    a, b = Waitlist("G120"), Waitlist("G120")
+    erster = a.join("Ben", *SLOT, tisch_id="1")
+    zweiter = b.join("Cem", *SLOT, tisch_id="1")
+    assert zweiter["id"] == erster["id"] + 1
+
+    free("1", key)
+    assert b.promote("1", *SLOT)["person"] == "Ben"
+    assert [e["person"] for e in a.entries()] == ["Cem"]
+    # A new process rebuilds the same queues from the log
+    assert Waitlist("G120").entries() == a.entries()
+
+def test_log_is_compacted(data_dir):
+    book("1")
+    waitlist = Waitlist("G120")
+    bleibt = waitlist.join("Ben", *SLOT, tisch_id="1")
+    for _ in range(200):
+        waitlist.leave(waitlist.join("Cem", *SLOT, tisch_id="1")["id"])
+    with open(waitlist._log.path, encoding="utf-8") as f:
+        assert sum(1 for _ in f) < 100
+    assert Waitlist("G120").entries() == [bleibt]
+
+def test_freed_slot_is_assigned_in_the_background(data_dir):
+    key = book("1")
+    get_waitlist("G120").join("Ben", *SLOT, tisch_id="1")
+    free("1", key)
+    notify_freed("G120", "1", *SLOT)
+    wait_until_processed()
+    assert persons_on("1") == ["Ben"]